@@ -4,9 +4,10 @@ from __future__ import annotations
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
-from flask import Flask, render_template, abort, request, redirect, url_for
+from flask import Flask, render_template, abort, request, redirect, url_for, jsonify
 
 # ---- Local modules (make sure each folder has an empty __init__.py) ----
+from assets.manifest import init_app as init_assets
 from scraper.fetch_scores import get_sample_matches
 from db.models import (
     init_db,
@@ -14,14 +15,21 @@ from db.models import (
     fetch_matches,
     get_match_by_id,
     insert_live_match,
+    record_impact_snapshot,
+    read_match_snapshots,
+    read_player_snapshots,
 )
+from db.search import search_matches, suggest as suggest_matches
 from impact.sample_players import players as SAMPLE_PLAYERS
 from impact.calculator import (
     calculate_batting_impact,
     calculate_bowling_impact,
     calculate_impact_for_match,
+    compare_match_formulas,
+    compare_stored_impacts,
     summarize_impact,
 )
+from impact.formulas import list_formulas
 from services.cricket_api import get_live_matches, get_match_details
 
 
@@ -29,10 +37,12 @@ from services.cricket_api import get_live_matches, get_match_details
 # App bootstrap
 # -----------------------------------------------------------------------------
 app = Flask(__name__, template_folder="templates", static_folder="static")
+init_assets(app)  # asset_url()/asset_srcset() in templates + immutable caching for static/dist
 
-# Ensure local data dir exists and DB is initialized
+# Ensure local data dir exists and DB is initialized. Existing rows are kept, so
+# backfilled seasons survive restarts; samples are only seeded into an empty DB.
 Path("data").mkdir(exist_ok=True)
-init_db()
+init_db(reset=False)
 
 
 # -----------------------------------------------------------------------------
@@ -170,6 +180,10 @@ def _render_impact(match_id: Optional[str]):
                 impact_note = "Scorecard found but couldn’t be parsed. Try a different match."
         else:
             impact_summary = summarize_impact(impact_players)
+            try:
+                record_impact_snapshot(match_id, impact_players)  # history for momentum charts
+            except Exception:
+                pass  # history is best-effort; never break the page over it
 
     return render_template(
         "impact.html",
@@ -201,6 +215,43 @@ def show_matches():
     return render_template("matches.html", matches=matches)
 
 
+def _search_args() -> Dict[str, Any]:
+    """Read search/filter params shared by /search and /api/search."""
+    page = max(request.args.get("page", type=int) or 1, 1)
+    per_page = min(max(request.args.get("per_page", type=int) or 20, 1), 100)
+    return {
+        "q": (request.args.get("q") or "").strip(),
+        "series": request.args.get("series") or None,
+        "team": request.args.get("team") or None,
+        "status": request.args.get("status") or None,
+        "limit": per_page,
+        "offset": (page - 1) * per_page,
+    }
+
+
+@app.route("/search")
+def show_search():
+    args = _search_args()
+    res = search_matches(**args)
+    for r in res["results"]:
+        r.update(_to_card(r))
+    return render_template("search.html",
+                           args=args,
+                           page=args["offset"] // args["limit"] + 1,
+                           pages=max((res["total"] + args["limit"] - 1) // args["limit"], 1),
+                           **res)
+
+
+@app.route("/api/search")
+def api_search():
+    return jsonify(search_matches(**_search_args()))
+
+
+@app.route("/api/search/suggest")
+def api_search_suggest():
+    return jsonify(suggest_matches(request.args.get("q") or ""))
+
+
 @app.route("/matches/<match_id>")
 def show_match_detail(match_id: str):
     # Try DB, then the bundled samples
@@ -269,6 +320,48 @@ def show_impact_match(match_id: str):
     return _render_impact(match_id)
 
 
+# --- Impact history (JSON for sparklines / replays) ---
+@app.route("/api/impact/<match_id>/history")
+def impact_history(match_id: str):
+    since = request.args.get("since", type=int) or 0
+    formula = request.args.get("formula") or None
+    return jsonify({"match_id": match_id,
+                    "players": read_match_snapshots(match_id, since_seq=since, formula=formula)})
+
+
+@app.route("/api/players/<path:player_key>/history")
+def player_impact_history(player_key: str):
+    match_id = request.args.get("match_id") or None
+    formula = request.args.get("formula") or None
+    return jsonify({"player_key": player_key,
+                    "points": read_player_snapshots(player_key, match_id=match_id, formula=formula)})
+
+
+# --- Impact formulas: registry + what-if comparisons (JSON) ---
+@app.route("/api/formulas")
+def api_formulas():
+    return jsonify(list_formulas())
+
+
+@app.route("/api/impact/compare")
+def api_impact_compare():
+    """
+    ?formulas=classic@1,t20@1 (default: all registered). With ?match_id=, scores
+    that match's scorecard; otherwise (or with &source=stored) re-scores the
+    stored player_impacts and returns per-player totals.
+    """
+    formulas = [t.strip() for t in (request.args.get("formulas") or "").split(",") if t.strip()]
+    formulas = formulas or [f["tag"] for f in list_formulas()]
+    match_id = request.args.get("match_id") or None
+    limit = min(max(request.args.get("limit", type=int) or 50, 1), 500)
+    try:
+        if match_id and request.args.get("source") != "stored":
+            return jsonify(compare_match_formulas(match_id, formulas))
+        return jsonify(compare_stored_impacts(formulas, match_id=match_id, limit=limit))
+    except ValueError as exc:   # unknown formula tag
+        return jsonify({"error": str(exc)}), 400
+
+
 # -----------------------------------------------------------------------------
 # Main
 # -----------------------------------------------------------------------------
@@ -0,0 +1,123 @@
+"""
+Static image build step.
+
+Resizes and recompresses the PNGs under static/ into the sizes the templates
+actually render, as both PNG (palette-quantized) and WebP, with content-hashed
+filenames under static/dist/ and a manifest.json that `assets.manifest`
+reads at runtime:
+
+    python -m assets.build
+
+Requires Pillow (`pip install pillow`) — only for this build step; the app
+itself runs without it and falls back to the original files when no
+manifest has been built.
+"""
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import hashlib
+import io
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+STATIC_DIR = Path("static")
+DIST_DIRNAME = "dist"
+
+# Source pattern (relative to static/) -> CSS widths rendered by the templates.
+# Each width is also built at 2x for high-DPI screens.
+SIZES: Dict[str, Tuple[int, ...]] = {
+    "cricImpact_logo.png": (40,),     # navbar brand (layout.html, height: 40px)
+    "logos/*.png": (32, 64),          # team badges
+}
+FORMATS = ("webp", "png")
+
+
+def _widths_for(rel: str) -> List[int]:
+    for pattern, widths in SIZES.items():
+        if fnmatch.fnmatch(rel, pattern):
+            return sorted({w * m for w in widths for m in (1, 2)})
+    return []
+
+
+def _encode(im, fmt: str) -> bytes:
+    from PIL import Image
+
+    buf = io.BytesIO()
+    if fmt == "webp":
+        im.save(buf, "WEBP", quality=85, method=6)
+    else:
+        # Logos are flat artwork: a 256-colour palette is visually lossless and far smaller
+        pal = im.convert("RGBA").quantize(colors=256, method=Image.Quantize.FASTOCTREE)
+        pal.save(buf, "PNG", optimize=True)
+    return buf.getvalue()
+
+
+def build(static_dir: Path = STATIC_DIR) -> Dict[str, dict]:
+    try:
+        from PIL import Image
+    except ImportError:  # pragma: no cover
+        raise SystemExit("Pillow is required for the asset build: pip install pillow")
+
+    dist = static_dir / DIST_DIRNAME
+    dist.mkdir(parents=True, exist_ok=True)
+    manifest: Dict[str, dict] = {}
+    written = set()
+
+    for src in sorted(static_dir.rglob("*.png")):
+        rel = src.relative_to(static_dir).as_posix()
+        if rel.startswith(DIST_DIRNAME + "/"):
+            continue
+        widths = _widths_for(rel)
+        if not widths:
+            continue
+        with Image.open(src) as im:
+            im.load()
+            variants = []
+            for w in widths:
+                w = min(w, im.width)
+                h = max(1, round(im.height * w / im.width))
+                resized = im.resize((w, h), Image.LANCZOS)
+                for fmt in FORMATS:
+                    data = _encode(resized, fmt)
+                    digest = hashlib.sha256(data).hexdigest()[:10]
+                    stem = rel[:-len(".png")].replace("/", "-")
+                    name = f"{stem}.{w}w.{digest}.{fmt}"
+                    out = dist / name
+                    if not out.exists():
+                        out.write_bytes(data)
+                    written.add(name)
+                    variants.append({"file": f"{DIST_DIRNAME}/{name}", "width": w, "height": h,
+                                     "format": fmt, "bytes": len(data)})
+        manifest[rel] = {"bytes": src.stat().st_size, "variants": variants}
+
+    # Drop stale hashed files from earlier builds
+    for old in dist.iterdir():
+        if old.name != "manifest.json" and old.name not in written:
+            old.unlink()
+
+    tmp = dist / "manifest.json.tmp"
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    os.replace(tmp, dist / "manifest.json")
+    return manifest
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m assets.build", description=__doc__.split("\n\n")[0])
+    ap.add_argument("--static", default=str(STATIC_DIR), help="static folder (default: static)")
+    args = ap.parse_args(argv)
+
+    manifest = build(Path(args.static))
+    for rel, entry in manifest.items():
+        best = min(v["bytes"] for v in entry["variants"])
+        print(f"{rel}: {entry['bytes'] // 1024} KB -> {len(entry['variants'])} variants "
+              f"(smallest {best / 1024:.1f} KB)")
+    print(f"✅ Wrote {Path(args.static) / DIST_DIRNAME / 'manifest.json'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
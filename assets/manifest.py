@@ -0,0 +1,70 @@
+"""
+Runtime side of the asset build (see assets/build.py).
+
+`init_app(app)` exposes `asset_url()` / `asset_srcset()` to templates and
+marks the hashed files under /static/dist/ as immutable. Without a built
+manifest both helpers return the original file, so the app works unbuilt.
+"""
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from flask import Flask, request, url_for
+
+ONE_YEAR = 365 * 24 * 3600
+
+_cache: Dict[str, Any] = {"mtime": None, "manifest": {}}
+
+
+def _manifest(static_folder: str) -> Dict[str, dict]:
+    path = os.path.join(static_folder, "dist", "manifest.json")
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return {}
+    if _cache["mtime"] != mtime:   # rebuilt since we last looked
+        with open(path, encoding="utf-8") as fh:
+            _cache["manifest"] = json.load(fh)
+        _cache["mtime"] = mtime
+    return _cache["manifest"]
+
+
+def _variants(filename: str, fmt: str) -> List[dict]:
+    from flask import current_app
+
+    entry = _manifest(current_app.static_folder).get(filename) or {}
+    return sorted((v for v in entry.get("variants", []) if v["format"] == fmt), key=lambda v: v["width"])
+
+
+def asset_url(filename: str, width: Optional[int] = None, fmt: str = "png") -> str:
+    """URL of the smallest built variant at least `width` px wide (or the original file)."""
+    variants = _variants(filename, fmt)
+    if not variants:
+        return url_for("static", filename=filename)
+    pick = variants[-1]
+    if width:
+        pick = next((v for v in variants if v["width"] >= width), pick)
+    return url_for("static", filename=pick["file"])
+
+
+def asset_srcset(filename: str, width: int, fmt: str = "png") -> str:
+    """'url 1x, url2 2x' for an image rendered `width` CSS px wide ('' if not built)."""
+    if not _variants(filename, fmt):
+        return ""
+    one, two = asset_url(filename, width, fmt), asset_url(filename, width * 2, fmt)
+    return one if one == two else f"{one} 1x, {two} 2x"
+
+
+def init_app(app: Flask) -> None:
+    app.jinja_env.globals.update(asset_url=asset_url, asset_srcset=asset_srcset)
+
+    dist_prefix = (app.static_url_path or "/static").rstrip("/") + "/dist/"
+
+    @app.after_request
+    def _immutable_dist(response):
+        # Hashed filenames change whenever content does, so these can be cached forever
+        if request.path.startswith(dist_prefix) and response.status_code in (200, 304):
+            response.headers["Cache-Control"] = f"public, max-age={ONE_YEAR}, immutable"
+        return response
@@ -1,17 +1,33 @@
 import sqlite3
+import time
 
 DB_PATH = "data/matches.sqlite"
 
-def init_db():
+# Free-text statuses ("India won by 6 wickets", "Match not started", "Eng need 40 runs")
+# collapsed into live / finished / upcoming. Stored on `matches.status_bucket` so
+# search facets and snapshot compaction don't re-run these LIKEs per row.
+_STATUS_BUCKET_SQL = (
+    "CASE WHEN lower(status) LIKE '%won%' OR lower(status) LIKE '%draw%' OR lower(status) LIKE '%tied%' "
+    "OR lower(status) LIKE '%no result%' OR lower(status) LIKE '%abandon%' OR lower(status) LIKE '%finished%' "
+    "THEN 'finished' "
+    "WHEN COALESCE(status, '') = '' OR lower(status) LIKE '%not started%' "
+    "OR lower(status) LIKE '%starts%' OR lower(status) LIKE '%scheduled%' THEN 'upcoming' "
+    "ELSE 'live' END"
+)
+
+def init_db(reset=True):
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
 
-    # Drop old matches table if it exists (clean reset)
-    cursor.execute("DROP TABLE IF EXISTS matches")
+    # Drop old matches table if it exists (clean reset).
+    # Offline loaders pass reset=False so they only add what's missing.
+    if reset:
+        cursor.execute("DROP TABLE IF EXISTS matches")
+        cursor.execute("DROP TABLE IF EXISTS matches_fts")
 
     # Recreate match table with extended fields
-    cursor.execute('''
-    CREATE TABLE matches (
+    cursor.execute(f'''
+    CREATE TABLE IF NOT EXISTS matches (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         match_id TEXT,
         team1 TEXT,
@@ -22,9 +38,15 @@ def init_db():
         venue TEXT,
         date TEXT,
         toss TEXT,
-        winner TEXT
+        winner TEXT,
+        status_bucket TEXT GENERATED ALWAYS AS ({_STATUS_BUCKET_SQL}) STORED
     )
     ''')
+    if not any(col[1] == "status_bucket" for col in cursor.execute("PRAGMA table_xinfo(matches)")):
+        # Tables from before the column existed (reset=False); ALTER can only add VIRTUAL ones
+        cursor.execute(
+            f"ALTER TABLE matches ADD COLUMN status_bucket TEXT GENERATED ALWAYS AS ({_STATUS_BUCKET_SQL}) VIRTUAL"
+        )
 
     # Create player table (leave as-is if you're already using it)
     cursor.execute('''
@@ -40,11 +62,168 @@ def init_db():
     )
     ''')
 
+    # One row per match so bulk loads can upsert instead of check-then-insert
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_matches_match_id ON matches (match_id)")
+    # Filter indexes for db/search.py: (filter, id) so newest-first hits are an index walk with
+    # no sort, with the other facet columns alongside so counts and facets stay in the index
+    for old in ("idx_matches_series", "idx_matches_team1", "idx_matches_team2", "idx_matches_status_bucket"):
+        cursor.execute(f"DROP INDEX IF EXISTS {old}")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_matches_series_hits "
+                   "ON matches (series, id, team1, team2, status_bucket)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_matches_team1_hits "
+                   "ON matches (team1, id, team2, series, status_bucket)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_matches_team2_hits "
+                   "ON matches (team2, id, team1, series, status_bucket)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_matches_status_hits "
+                   "ON matches (status_bucket, id, series, team1, team2)")
+
+    _init_match_search(cursor)
+
+    # Per-player impact as computed by impact/calculator (bulk-loaded by the backfill)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS player_impacts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        match_id TEXT NOT NULL,
+        player_key TEXT NOT NULL,
+        name TEXT,
+        team TEXT,
+        role TEXT,
+        runs INTEGER,
+        balls INTEGER,
+        wickets INTEGER,
+        overs REAL,
+        bat_impact REAL,
+        bowl_impact REAL,
+        impact_score REAL,
+        formula TEXT NOT NULL DEFAULT 'classic@1'
+    )
+    ''')
+    if not any(col[1] == "formula" for col in cursor.execute("PRAGMA table_info(player_impacts)")):
+        # Rows from before formulas were pluggable were all scored with classic@1
+        cursor.execute("ALTER TABLE player_impacts ADD COLUMN formula TEXT NOT NULL DEFAULT 'classic@1'")
+    # One row per match, player and formula version (see impact/formulas.py)
+    cursor.execute("DROP INDEX IF EXISTS idx_player_impacts_match_player")
+    cursor.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_player_impacts_match_player_formula "
+        "ON player_impacts (match_id, player_key, formula)"
+    )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_player_impacts_player ON player_impacts (player_key)")
+
+    # Player identity index (see impact/identity.py): alias -> canonical player id
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS player_aliases (
+        alias TEXT PRIMARY KEY,
+        canonical_id TEXT NOT NULL
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS player_identities (
+        canonical_id TEXT PRIMARY KEY,
+        name TEXT,
+        team TEXT
+    ) WITHOUT ROWID
+    ''')
+
+    # Which archive members a backfill source has already committed (for resume)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+        source TEXT NOT NULL,
+        item TEXT NOT NULL,
+        PRIMARY KEY (source, item)
+    ) WITHOUT ROWID
+    ''')
+
+    # Live impact history. Values are stored as integer hundredths; a row is
+    # either a keyframe (absolute values) or a delta against the player's
+    # previous row, and only players whose numbers changed get a row per poll.
+    # Each poll records the formula tag it was scored with; a player's deltas
+    # never chain across tags (a change of formula starts a new keyframe).
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS impact_snapshot_polls (
+        match_id TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        ts REAL NOT NULL,
+        formula TEXT NOT NULL DEFAULT 'classic@1',
+        PRIMARY KEY (match_id, seq)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS impact_snapshots (
+        match_id TEXT NOT NULL,
+        player_key TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        keyframe INTEGER NOT NULL,
+        impact INTEGER NOT NULL,
+        bat INTEGER NOT NULL,
+        bowl INTEGER NOT NULL,
+        PRIMARY KEY (match_id, player_key, seq)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_impact_snapshots_player ON impact_snapshots (player_key)")
+    # Latest absolute values per player, so a poll can diff without replaying history
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS impact_snapshot_heads (
+        match_id TEXT NOT NULL,
+        player_key TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        impact INTEGER NOT NULL,
+        bat INTEGER NOT NULL,
+        bowl INTEGER NOT NULL,
+        formula TEXT NOT NULL DEFAULT 'classic@1',
+        PRIMARY KEY (match_id, player_key)
+    ) WITHOUT ROWID
+    ''')
+    for table in ("impact_snapshot_polls", "impact_snapshot_heads"):
+        if not any(col[1] == "formula" for col in cursor.execute(f"PRAGMA table_info({table})")):
+            # History from before formulas were pluggable was all classic@1
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN formula TEXT NOT NULL DEFAULT 'classic@1'")
+
     conn.commit()
     conn.close()
     print("✅ Database created with updated schema.")
 
 
+def _init_match_search(cursor):
+    """
+    Full-text index over matches (queried by db/search.py). It's an external-content
+    FTS5 table, so it stores only the index; triggers keep it in sync with every
+    insert, upsert and delete on `matches`.
+    """
+    existed = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'matches_fts'"
+    ).fetchone()
+    cursor.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS matches_fts USING fts5(
+        team1, team2, series, venue, date, status,
+        content = 'matches', content_rowid = 'id',
+        prefix = '2 3', tokenize = 'unicode61 remove_diacritics 2'
+    )
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS matches_fts_ai AFTER INSERT ON matches BEGIN
+        INSERT INTO matches_fts (rowid, team1, team2, series, venue, date, status)
+        VALUES (new.id, new.team1, new.team2, new.series, new.venue, new.date, new.status);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS matches_fts_ad AFTER DELETE ON matches BEGIN
+        INSERT INTO matches_fts (matches_fts, rowid, team1, team2, series, venue, date, status)
+        VALUES ('delete', old.id, old.team1, old.team2, old.series, old.venue, old.date, old.status);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS matches_fts_au AFTER UPDATE ON matches BEGIN
+        INSERT INTO matches_fts (matches_fts, rowid, team1, team2, series, venue, date, status)
+        VALUES ('delete', old.id, old.team1, old.team2, old.series, old.venue, old.date, old.status);
+        INSERT INTO matches_fts (rowid, team1, team2, series, venue, date, status)
+        VALUES (new.id, new.team1, new.team2, new.series, new.venue, new.date, new.status);
+    END
+    ''')
+    if not existed:
+        # Index whatever was stored before search existed
+        cursor.execute("INSERT INTO matches_fts (matches_fts) VALUES ('rebuild')")
+
+
 def insert_match(match):
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
@@ -168,3 +347,437 @@ def insert_live_match(match):
         conn.commit()
 
     conn.close()
+
+
+def _player_key(p):
+    """Stable per-player key for an impact row: the canonical player id when known."""
+    return p.get('player_id') or f"{p.get('team', '')}::{p.get('name', '')}"
+
+
+# ---------------- Bulk loading (used by scraper/backfill.py) ----------------
+_UPSERT_MATCH_SQL = '''
+    INSERT INTO matches (match_id, team1, team2, status, score, series, venue, date, toss, winner)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (match_id) DO UPDATE SET
+        team1 = excluded.team1, team2 = excluded.team2, status = excluded.status,
+        score = excluded.score, series = excluded.series, venue = excluded.venue,
+        date = excluded.date, toss = excluded.toss, winner = excluded.winner
+'''
+
+_UPSERT_PLAYER_IMPACT_SQL = '''
+    INSERT INTO player_impacts (match_id, player_key, name, team, role, runs, balls, wickets, overs,
+                                bat_impact, bowl_impact, impact_score, formula)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (match_id, player_key, formula) DO UPDATE SET
+        name = excluded.name, team = excluded.team, role = excluded.role,
+        runs = excluded.runs, balls = excluded.balls, wickets = excluded.wickets, overs = excluded.overs,
+        bat_impact = excluded.bat_impact, bowl_impact = excluded.bowl_impact,
+        impact_score = excluded.impact_score
+'''
+
+
+def _player_impact_row(match_id, p):
+    return (
+        match_id, _player_key(p), p.get('name', ''),
+        p.get('team', ''), p.get('role', ''), p.get('runs', 0), p.get('balls', 0),
+        p.get('wickets', 0), p.get('overs', 0.0), p.get('bat_impact', 0.0),
+        p.get('bowl_impact', 0.0), p.get('impact_score', 0.0), p.get('formula') or 'classic@1'
+    )
+
+
+def filter_pending_backfill(source, items):
+    """Return the subset of `items` that `source` hasn't committed yet (order preserved)."""
+    items = list(items)
+    if not items:
+        return []
+    conn = sqlite3.connect(DB_PATH)
+    placeholders = ",".join("?" * len(items))
+    done = {
+        row[0] for row in conn.execute(
+            f"SELECT item FROM backfill_checkpoints WHERE source = ? AND item IN ({placeholders})",
+            (source, *items),
+        )
+    }
+    conn.close()
+    return [i for i in items if i not in done]
+
+
+def write_backfill_batch(source, batch):
+    """
+    Write one batch of backfilled matches in a single transaction.
+
+    `batch` is a list of (item, match, players) where `match` is a matches-row dict
+    (or None if the file had nothing usable) and `players` is a list of impact dicts
+    from impact/calculator. Checkpoints are written in the same transaction, so a
+    crash never leaves an item half-loaded or loaded-but-unmarked.
+    """
+    if not batch:
+        return
+    match_rows, player_rows, checkpoint_rows = [], [], []
+    for item, match, players in batch:
+        checkpoint_rows.append((source, item))
+        if not match:
+            continue
+        match_rows.append((
+            match['match_id'], match.get('team1', ''), match.get('team2', ''), match.get('status', ''),
+            match.get('score', ''), match.get('series', ''), match.get('venue', ''), match.get('date', ''),
+            match.get('toss', ''), match.get('winner', '')
+        ))
+        for p in players or []:
+            player_rows.append(_player_impact_row(match['match_id'], p))
+
+    conn = sqlite3.connect(DB_PATH)
+    with conn:
+        conn.executemany(_UPSERT_MATCH_SQL, match_rows)
+        conn.executemany(_UPSERT_PLAYER_IMPACT_SQL, player_rows)
+        conn.executemany(
+            "INSERT OR IGNORE INTO backfill_checkpoints (source, item) VALUES (?, ?)", checkpoint_rows
+        )
+    conn.close()
+
+
+def write_player_impacts(rows):
+    """Upsert impact rows that carry their own match_id (e.g. re-scored under another formula)."""
+    if not rows:
+        return
+    conn = sqlite3.connect(DB_PATH)
+    with conn:
+        conn.executemany(_UPSERT_PLAYER_IMPACT_SQL, [_player_impact_row(r['match_id'], r) for r in rows])
+    conn.close()
+
+
+def iter_player_stats(match_id=None, chunk_size=5000):
+    """
+    Yield lists of stored per-player match stats (match_id, player_key, name, team,
+    runs, balls, wickets, overs), one row per player-match whatever formulas it was
+    stored under. Pages by key so memory stays flat and no read is held open
+    between chunks (callers may write back as they go).
+    """
+    keys = ("match_id", "player_key", "name", "team", "runs", "balls", "wickets", "overs")
+    where, params = ["(match_id, player_key) > (?, ?)"], []
+    if match_id is not None:
+        where.append("match_id = ?")
+        params.append(match_id)
+    sql = f'''
+        SELECT match_id, player_key, MAX(name), MAX(team), COALESCE(MAX(runs), 0), COALESCE(MAX(balls), 0),
+               COALESCE(MAX(wickets), 0), COALESCE(MAX(overs), 0)
+        FROM player_impacts
+        WHERE {" AND ".join(where)}
+        GROUP BY match_id, player_key
+        ORDER BY match_id, player_key
+        LIMIT ?
+    '''
+    last = ("", "")
+    while True:
+        conn = sqlite3.connect(DB_PATH)
+        rows = conn.execute(sql, (*last, *params, chunk_size)).fetchall()
+        conn.close()
+        if not rows:
+            break
+        yield [dict(zip(keys, row)) for row in rows]
+        last = rows[-1][:2]
+
+
+def fetch_player_impact_totals(limit=50, formula=None):
+    """
+    Career-style totals across every stored match, grouped by canonical player id, for one formula.
+    The team comes from the impact rows (display spelling; MAX skips bowling rows stored without
+    one), not player_identities, which only keeps the normalized team used for matching.
+    """
+    from impact.formulas import get_formula
+
+    conn = sqlite3.connect(DB_PATH)
+    rows = conn.execute('''
+        SELECT pi.player_key, COALESCE(NULLIF(id.name, ''), MAX(pi.name)), MAX(pi.team),
+               COUNT(*), SUM(pi.runs), SUM(pi.wickets), ROUND(SUM(pi.impact_score), 2), ROUND(AVG(pi.impact_score), 2)
+        FROM player_impacts pi
+        LEFT JOIN player_identities id ON id.canonical_id = pi.player_key
+        WHERE pi.formula = ?
+        GROUP BY pi.player_key
+        ORDER BY SUM(pi.impact_score) DESC
+        LIMIT ?
+    ''', (get_formula(formula).tag, limit)).fetchall()
+    conn.close()
+    return [
+        {
+            "player_id": row[0],
+            "name": row[1],
+            "team": row[2],
+            "matches": row[3],
+            "runs": row[4],
+            "wickets": row[5],
+            "total_impact": row[6],
+            "avg_impact": row[7]
+        } for row in rows
+    ]
+
+
+# ---------------- Player identities (used by impact/identity.py) ----------------
+def load_player_identities():
+    """Return ({alias: canonical_id}, {canonical_id: (name, team)})."""
+    conn = sqlite3.connect(DB_PATH)
+    aliases = dict(conn.execute("SELECT alias, canonical_id FROM player_aliases"))
+    players = {row[0]: (row[1] or "", row[2] or "") for row in conn.execute(
+        "SELECT canonical_id, name, team FROM player_identities"
+    )}
+    conn.close()
+    return aliases, players
+
+
+def save_player_identities(aliases, players):
+    """
+    Store new (alias, canonical_id) and (canonical_id, name, team) rows.
+
+    An alias that already exists keeps its stored id (first writer wins), except
+    that a shared alias can always be downgraded to ambiguous (''). A player's
+    stored name is replaced by a longer one ("V Kohli" -> "Virat Kohli") and an
+    unknown team is filled in. Returns the stored mapping for the given aliases
+    so callers can adopt the winners.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    with conn:
+        conn.executemany('''
+            INSERT INTO player_aliases (alias, canonical_id) VALUES (?, ?)
+            ON CONFLICT (alias) DO UPDATE SET canonical_id = excluded.canonical_id
+            WHERE excluded.canonical_id = ''
+        ''', aliases)
+        conn.executemany('''
+            INSERT INTO player_identities (canonical_id, name, team) VALUES (?, ?, ?)
+            ON CONFLICT (canonical_id) DO UPDATE SET
+                name = CASE WHEN length(excluded.name) > length(COALESCE(player_identities.name, ''))
+                            THEN excluded.name ELSE player_identities.name END,
+                team = CASE WHEN COALESCE(player_identities.team, '') = ''
+                            THEN excluded.team ELSE player_identities.team END
+        ''', players)
+    stored = {}
+    keys = [a for a, _ in aliases]
+    for i in range(0, len(keys), 500):
+        chunk = keys[i:i + 500]
+        stored.update(conn.execute(
+            f"SELECT alias, canonical_id FROM player_aliases WHERE alias IN ({','.join('?' * len(chunk))})",
+            chunk,
+        ))
+    conn.close()
+    return stored
+
+
+# ---------------- Live impact snapshots ----------------
+
+
+def _cents(x):
+    return int(round(float(x or 0) * 100))
+
+
+def record_impact_snapshot(match_id, players, ts=None):
+    """
+    Record one poll of a match's per-player impact (rows from calculate_impact_for_match).
+
+    Only players whose numbers changed since their last stored value get a row, and
+    a poll where nothing changed writes nothing. The poll is tagged with the rows'
+    formula; a player last stored under a different one gets a keyframe, not a
+    delta. Returns the number of rows written.
+    """
+    if not match_id or not players:
+        return 0
+    ts = time.time() if ts is None else ts
+    formula = players[0].get("formula") or 'classic@1'
+
+    conn = sqlite3.connect(DB_PATH, isolation_level=None)
+    try:
+        # IMMEDIATE takes the write lock up front so concurrent workers can't race on seq
+        conn.execute("BEGIN IMMEDIATE")
+        heads = {
+            row[0]: row[1:] for row in conn.execute(
+                "SELECT player_key, impact, bat, bowl FROM impact_snapshot_heads WHERE match_id = ? AND formula = ?",
+                (match_id, formula),
+            )
+        }
+        # Players whose head is under another formula: must be rewritten even if the numbers match
+        stale = {
+            row[0] for row in conn.execute(
+                "SELECT player_key FROM impact_snapshot_heads WHERE match_id = ? AND formula != ?",
+                (match_id, formula),
+            )
+        }
+        changed = []
+        for p in players:
+            key = _player_key(p)
+            cur = (_cents(p.get("impact_score")), _cents(p.get("bat_impact")), _cents(p.get("bowl_impact")))
+            prev = heads.get(key)
+            if prev != cur or key in stale:
+                changed.append((key, cur, prev))
+        if not changed:
+            conn.execute("COMMIT")
+            return 0
+
+        seq = conn.execute(
+            "SELECT COALESCE(MAX(seq), 0) + 1 FROM impact_snapshot_polls WHERE match_id = ?", (match_id,)
+        ).fetchone()[0]
+        conn.execute(
+            "INSERT INTO impact_snapshot_polls (match_id, seq, ts, formula) VALUES (?, ?, ?, ?)",
+            (match_id, seq, ts, formula),
+        )
+
+        rows, head_rows = [], []
+        for key, cur, prev in changed:
+            if prev is None:
+                rows.append((match_id, key, seq, 1, *cur))
+            else:
+                rows.append((match_id, key, seq, 0, *(c - p for c, p in zip(cur, prev))))
+            head_rows.append((match_id, key, seq, *cur, formula))
+        conn.executemany(
+            "INSERT INTO impact_snapshots (match_id, player_key, seq, keyframe, impact, bat, bowl) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO impact_snapshot_heads (match_id, player_key, seq, impact, bat, bowl, formula) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", head_rows
+        )
+        conn.execute("COMMIT")
+        return len(rows)
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def _replay(rows):
+    """Turn (player_key, match_id, seq, ts, formula, keyframe, impact, bat, bowl) rows into absolute points."""
+    series = {}
+    state = {}
+    for key, match_id, seq, ts, formula, keyframe, impact, bat, bowl in rows:
+        k = (match_id, key)
+        if keyframe or k not in state:
+            state[k] = [impact, bat, bowl]
+        else:
+            s = state[k]
+            s[0] += impact
+            s[1] += bat
+            s[2] += bowl
+        s = state[k]
+        series.setdefault(k, []).append({
+            "match_id": match_id, "seq": seq, "ts": ts, "formula": formula,
+            "impact_score": s[0] / 100, "bat_impact": s[1] / 100, "bowl_impact": s[2] / 100,
+        })
+    return series
+
+
+def _match_history_rows(conn, match_id, formula=None):
+    sql = '''
+        SELECT s.player_key, s.match_id, s.seq, p.ts, p.formula, s.keyframe, s.impact, s.bat, s.bowl
+        FROM impact_snapshots s
+        JOIN impact_snapshot_polls p ON p.match_id = s.match_id AND p.seq = s.seq
+        WHERE s.match_id = ?
+    '''
+    params = [match_id]
+    if formula:
+        sql += " AND p.formula = ?"   # safe: each formula's run starts with a keyframe
+        params.append(formula)
+    sql += " ORDER BY s.player_key, s.seq"
+    return conn.execute(sql, params).fetchall()
+
+
+def read_match_snapshots(match_id, since_seq=0, formula=None):
+    """
+    Impact history for one match: {player_key: [{seq, ts, formula, impact_score, ...}, ...]},
+    optionally only the points scored with `formula`.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    rows = _match_history_rows(conn, match_id, formula)
+    conn.close()
+    return {
+        key: [pt for pt in points if pt["seq"] > since_seq]
+        for (_, key), points in _replay(rows).items()
+    }
+
+
+def read_player_snapshots(player_key, match_id=None, formula=None):
+    """Impact history for one player, across all matches or just `match_id`, optionally for one formula."""
+    sql = '''
+        SELECT s.player_key, s.match_id, s.seq, p.ts, p.formula, s.keyframe, s.impact, s.bat, s.bowl
+        FROM impact_snapshots s
+        JOIN impact_snapshot_polls p ON p.match_id = s.match_id AND p.seq = s.seq
+        WHERE s.player_key = ?
+    '''
+    params = [player_key]
+    if match_id:
+        sql += " AND s.match_id = ?"
+        params.append(match_id)
+    if formula:
+        sql += " AND p.formula = ?"
+        params.append(formula)
+    sql += " ORDER BY s.match_id, s.seq"
+    conn = sqlite3.connect(DB_PATH)
+    rows = conn.execute(sql, params).fetchall()
+    conn.close()
+    out = []
+    for points in _replay(rows).values():
+        out.extend(points)
+    return out
+
+
+def _pick_keyframes(points, keyframes):
+    """Evenly spaced points, always keeping the first and the last."""
+    if len(points) <= keyframes:
+        return points
+    if keyframes <= 1:
+        return points[-1:]
+    step = (len(points) - 1) / (keyframes - 1)
+    return [points[round(i * step)] for i in range(keyframes)]
+
+
+def compact_impact_snapshots(match_id, keyframes=4):
+    """Fold a match's history into at most `keyframes` absolute rows per player and formula."""
+    conn = sqlite3.connect(DB_PATH, isolation_level=None)
+    try:
+        # Read and rewrite under one write lock, so a poll recorded meanwhile can't be
+        # deleted or left as a delta against a folded-away row
+        conn.execute("BEGIN IMMEDIATE")
+        rows = []
+        for (_, key), points in _replay(_match_history_rows(conn, match_id)).items():
+            by_formula = {}
+            for pt in points:
+                by_formula.setdefault(pt["formula"], []).append(pt)
+            for pt in (pt for run in by_formula.values() for pt in _pick_keyframes(run, keyframes)):
+                rows.append((match_id, key, pt["seq"], 1, _cents(pt["impact_score"]),
+                             _cents(pt["bat_impact"]), _cents(pt["bowl_impact"])))
+
+        conn.execute("DELETE FROM impact_snapshots WHERE match_id = ?", (match_id,))
+        conn.executemany(
+            "INSERT INTO impact_snapshots (match_id, player_key, seq, keyframe, impact, bat, bowl) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+        )
+        conn.execute('''
+            DELETE FROM impact_snapshot_polls
+            WHERE match_id = ? AND seq NOT IN (SELECT seq FROM impact_snapshots WHERE match_id = ?)
+        ''', (match_id, match_id))
+        conn.execute("COMMIT")
+        return len(rows)
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def compact_finished_snapshots(keyframes=4, idle_seconds=6 * 3600):
+    """
+    Compact every match that is finished (per `matches.status`) or hasn't been
+    polled for `idle_seconds`. Matches already folded to keyframes are skipped.
+    Returns the list of compacted match ids.
+    """
+    cutoff = time.time() - idle_seconds
+    conn = sqlite3.connect(DB_PATH)
+    match_ids = [row[0] for row in conn.execute('''
+        SELECT p.match_id
+        FROM impact_snapshot_polls p
+        GROUP BY p.match_id
+        HAVING (MAX(p.ts) < ?
+                OR p.match_id IN (SELECT match_id FROM matches WHERE status_bucket = 'finished'))
+           AND EXISTS (SELECT 1 FROM impact_snapshots s WHERE s.match_id = p.match_id AND s.keyframe = 0)
+    ''', (cutoff,))]
+    conn.close()
+    for mid in match_ids:
+        compact_impact_snapshots(mid, keyframes=keyframes)
+    return match_ids
@@ -0,0 +1,199 @@
+"""
+Match search over the `matches` table, backed by the `matches_fts` FTS5 index
+that `init_db()` creates and keeps in sync with triggers.
+
+Free text is split into words and every word must match (the last one as a
+prefix, so results update while typing). Results come back newest first and
+facets count the hits (the newest FACET_SAMPLE of them for broad queries) by
+series, team and status bucket.
+"""
+from __future__ import annotations
+
+import re
+import sqlite3
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from db import models
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+# Values of matches.status_bucket (see models._STATUS_BUCKET_SQL)
+STATUS_BUCKETS = ("live", "finished", "upcoming")
+
+# Broad queries (tens of thousands of hits) facet over the newest hits only, so
+# every search stays a bounded amount of work
+FACET_SAMPLE = 1000
+
+# Text + filter queries are counted hit by hit; past this many the total is reported as "N+"
+COUNT_CAP = 5000
+
+_COLUMNS = ("match_id", "team1", "team2", "status", "score", "series", "venue", "date", "toss", "winner",
+            "status_bucket")
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(str(text or "").lower())
+
+
+def _fts_query(text: str, columns: Optional[Tuple[str, ...]] = None) -> Optional[str]:
+    """User text -> safe FTS5 query: quoted words, ANDed, last word as a prefix."""
+    words = _words(text)
+    if not words:
+        return None
+    parts = ['"' + w.replace('"', '""') + '"' for w in words]
+    parts[-1] += "*"
+    query = " ".join(parts)
+    if columns:
+        query = "{" + " ".join(columns) + "}: (" + query + ")"
+    return query
+
+
+def _hits(q: str, series: Optional[str], team: Optional[str], status: Optional[str]):
+    """
+    SQL for the matching rows as (id, series, team1, team2, status_bucket), newest
+    first, in an order SQLite can stream without sorting: FTS5 walks its doclists
+    in rowid order, a team filter merges two (team, id, ...) index walks, and
+    other filters walk one (filter, id, ...) index that also carries the facet
+    columns.
+
+    Returns (hits_sql, hits_params, count_sql, count_params, count_cap): the
+    count is exact unless `count_cap` is set, in which case it stops at cap + 1.
+    """
+    where, params = [], []
+    if series:
+        where.append("series = ?")
+        params.append(series)
+    if status:
+        where.append("status_bucket = ?")
+        params.append(status)
+
+    fts = _fts_query(q)
+    if fts:
+        # Unary + keeps the planner from driving the query off a filter index and
+        # probing the FTS index once per row (orders of magnitude slower)
+        conds = [f"+m.{w}" for w in where]
+        if team:
+            conds.append("(+m.team1 = ? OR +m.team2 = ?)")
+            params.extend([team, team])
+        body = ("FROM matches_fts JOIN matches m ON m.id = matches_fts.rowid WHERE matches_fts MATCH ?"
+                + "".join(f" AND {c}" for c in conds))
+        hits = f"SELECT m.id, m.series, m.team1, m.team2, m.status_bucket {body} ORDER BY matches_fts.rowid DESC"
+        if not conds:
+            # Text-only: counted from the FTS doclists without touching `matches`
+            return hits, [fts], "SELECT COUNT(*) FROM matches_fts WHERE matches_fts MATCH ?", [fts], None
+        # Text + filters can only be counted hit by hit, so stop at the cap
+        count = f"SELECT COUNT(*) FROM (SELECT 1 {body} LIMIT {COUNT_CAP + 1})"
+        return hits, [fts, *params], count, [fts, *params], COUNT_CAP
+
+    rest = "".join(f" AND {w}" for w in where)
+    if team:
+        hits = (f"SELECT id, series, team1, team2, status_bucket FROM matches WHERE team1 = ?{rest} "
+                f"UNION SELECT id, series, team1, team2, status_bucket FROM matches WHERE team2 = ?{rest} "
+                f"ORDER BY 1 DESC")
+        count = (f"SELECT (SELECT COUNT(*) FROM matches WHERE team1 = ?{rest}) + "
+                 f"(SELECT COUNT(*) FROM matches WHERE team2 = ? AND team1 IS NOT ?{rest})")
+        return hits, [team, *params, team, *params], count, [team, *params, team, team, *params], None
+
+    cond = " WHERE " + " AND ".join(where) if where else ""
+    hits = f"SELECT id, series, team1, team2, status_bucket FROM matches{cond} ORDER BY id DESC"
+    return hits, params, f"SELECT COUNT(*) FROM matches{cond}", params, None
+
+
+def _top(counter: Counter, limit: int) -> List[Tuple[str, int]]:
+    return sorted(((k, n) for k, n in counter.items() if k), key=lambda kv: (-kv[1], kv[0]))[:limit]
+
+
+def _facets(hits: List[tuple]) -> Dict[str, Counter]:
+    if not hits:
+        return {"series": Counter(), "team": Counter(), "status": Counter()}
+    _, series, team1, team2, status = zip(*hits)
+    teams = Counter(team1)
+    teams.update(team2)
+    return {"series": Counter(series), "team": teams, "status": Counter(status)}
+
+
+def _rows_by_id(conn: sqlite3.Connection, ids: List[int]) -> List[tuple]:
+    if not ids:
+        return []
+    cols = ", ".join(_COLUMNS)
+    return conn.execute(
+        f"SELECT {cols} FROM matches WHERE id IN ({','.join('?' * len(ids))}) ORDER BY id DESC", ids
+    ).fetchall()
+
+
+def search_matches(
+    q: str = "",
+    series: Optional[str] = None,
+    team: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+    facet_limit: int = 10,
+    facet_sample: int = FACET_SAMPLE,
+) -> Dict[str, Any]:
+    """
+    Search stored matches, newest first.
+
+    Returns {"total", "total_capped", "results": [match dicts], "facets": {"series":
+    [(value, count)], "team": [...], "status": [...]}, "facets_sampled": bool}.
+    Facets cover all hits unless there are more than `facet_sample`, in which case
+    they cover the newest `facet_sample` and `facets_sampled` is True. `total` is
+    exact, except for text + filter queries with more than COUNT_CAP hits, where it
+    is COUNT_CAP and `total_capped` is True.
+    """
+    status = status if status in STATUS_BUCKETS else None
+    hits_sql, params, count_sql, count_params, count_cap = _hits(q, series, team, status)
+    conn = sqlite3.connect(models.DB_PATH)
+    try:
+        # One ordered pass over the newest hits feeds both the facets and the page;
+        # only pages past the facet sample need a second walk
+        head = conn.execute(f"{hits_sql} LIMIT ?", (*params, facet_sample + 1)).fetchall()
+        sampled = len(head) > facet_sample
+        if offset + limit <= len(head) or not sampled:
+            page = head[offset:offset + limit]
+        else:
+            page = conn.execute(f"{hits_sql} LIMIT ? OFFSET ?", (*params, limit, offset)).fetchall()
+        rows = _rows_by_id(conn, [h[0] for h in page])
+        counts = _facets(head[:facet_sample])
+        total = conn.execute(count_sql, count_params).fetchone()[0] if sampled else len(head)
+    except sqlite3.OperationalError:
+        return {"total": 0, "total_capped": False, "results": [],
+                "facets": {"series": [], "team": [], "status": []}, "facets_sampled": False}
+    finally:
+        conn.close()
+
+    capped = count_cap is not None and total > count_cap
+    return {
+        "total": count_cap if capped else total,
+        "total_capped": capped,
+        "results": [dict(zip(_COLUMNS, row)) for row in rows],
+        "facets": {name: _top(c, facet_limit) for name, c in counts.items()},
+        "facets_sampled": sampled,
+    }
+
+
+def suggest(prefix: str, limit: int = 8) -> List[str]:
+    """Autocomplete: team, series and venue names whose words start with what's been typed."""
+    fts = _fts_query(prefix, columns=("team1", "team2", "series", "venue"))
+    if not fts:
+        return []
+    words = _words(prefix)
+    conn = sqlite3.connect(models.DB_PATH)
+    try:
+        rows = conn.execute(
+            "SELECT team1, team2, series, venue FROM matches_fts WHERE matches_fts MATCH ? LIMIT 200", (fts,)
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return []
+    finally:
+        conn.close()
+
+    counts: Counter = Counter()
+    for row in rows:
+        for value in row:
+            vw = _words(value)
+            # every typed word is a word of the value, the last one as a prefix
+            if vw and all(w in vw for w in words[:-1]) and any(x.startswith(words[-1]) for x in vw):
+                counts[value] += 1
+    return [v for v, _ in counts.most_common(limit)]
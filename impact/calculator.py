@@ -1,6 +1,10 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from impact.formulas import FormulaRef, compile_kernel, get_formula, selection_key
+from impact.identity import PlayerIdentityIndex, get_identity_index
+from services.shared_cache import get_cache
 
 try:
     from services.cricket_api import get_match_details
@@ -8,7 +12,13 @@ except Exception:  # pragma: no cover
     get_match_details = None  # type: ignore
 
 
+# Seconds computed impact is shared across app workers (details are cached separately)
+IMPACT_CACHE_TTL = 30
+
+
 # ---------------- Basic impact formulas ----------------
+# These are the "classic@1" formula; impact/formulas.py holds it alongside the
+# other registered formulas that impact_rows() can score with.
 def calculate_batting_impact(runs: float, balls: float) -> float:
     runs = float(runs or 0)
     balls = float(balls or 0)
@@ -88,6 +98,13 @@ def _player_name(val: Any) -> str:
     return str(val or "")
 
 
+def _player_id(val: Any) -> str:
+    """Provider id of a player reference, if the API gave one."""
+    if isinstance(val, dict):
+        return str(val.get("id") or val.get("playerId") or val.get("pid") or "")
+    return ""
+
+
 # ---------------- Scorecard extraction ----------------
 def _extract_scorecards(details: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
@@ -126,12 +143,22 @@ def _combine(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
             v = _player_name(v)
             if not out.get(k):
                 out[k] = v
+        elif k in ("player_id", "provider_id"):
+            if not out.get(k):
+                out[k] = v
     return out
 
 
-def _normalize_from_scorecard(scorecard: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+def _normalize_from_scorecard(
+    scorecard: List[Dict[str, Any]],
+    identities: Optional[PlayerIdentityIndex] = None,
+) -> Dict[str, Dict[str, Any]]:
     """
-    Collapse a scorecard into per-player stats.
+    Collapse a scorecard into per-player stats, keyed by canonical player id.
+
+    `identities` resolves names/provider ids to canonical ids (so a bowling row
+    without a team still lands on the same player as their batting row). Without
+    one, a throwaway index dedupes within this scorecard only.
 
     Understands keys:
       batting blocks: 'batting' or 'batsmen'
@@ -144,6 +171,7 @@ def _normalize_from_scorecard(scorecard: List[Dict[str, Any]]) -> Dict[str, Dict
         - wickets: 'wickets'/'W'/'w'
     """
     players: Dict[str, Dict[str, Any]] = {}
+    identities = identities if identities is not None else PlayerIdentityIndex()
 
     for inn in scorecard or []:
         batting_team = _team_name(_pick(inn, ["batTeamName", "team", "teamName"], ""))
@@ -161,8 +189,10 @@ def _normalize_from_scorecard(scorecard: List[Dict[str, Any]]) -> Dict[str, Dict
                 continue
             runs = _i(_pick(bt, ["runs", "R", "r"], 0))
             balls = _i(_pick(bt, ["balls", "B", "b"], 0))
-            entry = {"name": name, "team": batting_team, "runs": runs, "balls": balls, "wickets": 0, "overs": 0.0}
-            key = f"{batting_team}::{name}"   # key is ALWAYS a string
+            pid = _player_id(raw_name)
+            key = identities.resolve(name, batting_team, pid)   # key is ALWAYS a string
+            entry = {"name": name, "team": batting_team, "runs": runs, "balls": balls, "wickets": 0, "overs": 0.0,
+                     "player_id": key, "provider_id": pid}
             players[key] = _combine(players.get(key, {}), entry)
 
         # ---- bowling rows ----
@@ -179,47 +209,100 @@ def _normalize_from_scorecard(scorecard: List[Dict[str, Any]]) -> Dict[str, Dict
             wickets = _i(_pick(bl, ["wickets", "W", "w"], 0))
             overs = _overs_to_float(_pick(bl, ["overs", "O", "o"], 0))
             bowl_team = _team_name(_pick(bl, ["teamName", "team"], ""))  # sometimes present
-            entry = {"name": name, "team": bowl_team, "runs": 0, "balls": 0, "wickets": wickets, "overs": overs}
-            key = f"{bowl_team}::{name}"
+            pid = _player_id(raw_name)
+            key = identities.resolve(name, bowl_team, pid)
+            entry = {"name": name, "team": bowl_team, "runs": 0, "balls": 0, "wickets": wickets, "overs": overs,
+                     "player_id": key, "provider_id": pid}
             players[key] = _combine(players.get(key, {}), entry)
 
     return players
 
 
 # ---------------- Public API ----------------
-def calculate_impact_for_match(match_id: str) -> List[Dict[str, Any]]:
+def calculate_impact_for_match(match_id: str, formula: FormulaRef = None) -> List[Dict[str, Any]]:
     """Compute per-player impact from the most tolerant read of the scorecard."""
     if not match_id or get_match_details is None:
         return []
+    return get_cache().get_or_compute(
+        f"impact:{selection_key(formula)}:{match_id}",   # one entry per formula version
+        lambda: _compute_impact_for_match(match_id, formula),
+        ttl=IMPACT_CACHE_TTL,
+    )
 
-    details = get_match_details(match_id)
+
+def _match_players(match_id: str) -> Optional[tuple]:
+    """(details, per-player stats) for a match, or None if there's no usable scorecard."""
+    details = get_match_details(match_id) if get_match_details is not None else None
     if not details:
+        return None
+    scorecard = _extract_scorecards(details)
+    if not scorecard:
+        return None
+
+    identities = get_identity_index()
+    people = _normalize_from_scorecard(scorecard, identities)
+    try:
+        identities.flush()
+    except Exception:
+        pass  # keep serving; unsaved aliases are retried on the next flush
+    return details, list(people.values())
+
+
+def _compute_impact_for_match(match_id: str, formula: FormulaRef = None) -> List[Dict[str, Any]]:
+    found = _match_players(match_id)
+    if not found:
+        return []
+    details, people = found
+    return impact_rows(people, get_formula(formula, details.get("matchType")))
+
+
+def calculate_impact_from_details(
+    details: Dict[str, Any],
+    identities: Optional[PlayerIdentityIndex] = None,
+    formula: FormulaRef = None,
+) -> List[Dict[str, Any]]:
+    """Same as calculate_impact_for_match, but for an already-fetched payload (e.g. archived JSON)."""
+    if not isinstance(details, dict):
         return []
 
     scorecard = _extract_scorecards(details)
     if not scorecard:
         return []  # no card available yet
 
-    people = _normalize_from_scorecard(scorecard)
+    people = _normalize_from_scorecard(scorecard, identities)
+    return impact_rows(people.values(), get_formula(formula, details.get("matchType")))
+
+
+def _role(p: Dict[str, Any]) -> str:
+    return "All-rounder" if (p.get("wickets", 0) and p.get("runs", 0) >= 20) else \
+           ("Bowler" if p.get("wickets", 0) else "Batter")
 
+
+def _stat_row(p: Dict[str, Any]) -> tuple:
+    return (float(p.get("runs") or 0), float(p.get("balls") or 0),
+            float(p.get("wickets") or 0), float(p.get("overs") or 0))
+
+
+def impact_rows(people: Iterable[Dict[str, Any]], formula: FormulaRef = None) -> List[Dict[str, Any]]:
+    """Score per-player stat dicts (name/team/runs/balls/wickets/overs) into annotated, sorted impact rows."""
+    people = list(people)
+    (f,), kernel = compile_kernel([formula])
     out: List[Dict[str, Any]] = []
-    for p in people.values():
-        bat = calculate_batting_impact(p.get("runs", 0), p.get("balls", 0))
-        bowl = calculate_bowling_impact(p.get("wickets", 0), p.get("overs", 0.0))
-        total = round(bat + bowl, 2)
-        role = "All-rounder" if (p.get("wickets", 0) and p.get("runs", 0) >= 20) else \
-               ("Bowler" if p.get("wickets", 0) else "Batter")
+    for p, (bat, bowl) in zip(people, kernel(_stat_row(p) for p in people)):
         out.append({
+            "player_id": p.get("player_id", ""),
+            "provider_id": p.get("provider_id", ""),
             "name": _player_name(p.get("name", "")),
             "team": _team_name(p.get("team", "")),
-            "role": role,
-            "impact_score": total,
+            "role": _role(p),
+            "impact_score": round(bat + bowl, 2),
             "bat_impact": bat,
             "bowl_impact": bowl,
             "runs": p.get("runs", 0),
             "balls": p.get("balls", 0),
             "wickets": p.get("wickets", 0),
             "overs": p.get("overs", 0.0),
+            "formula": f.tag,
         })
 
     _annotate_with_team_stats(out)
@@ -227,6 +310,87 @@ def calculate_impact_for_match(match_id: str) -> List[Dict[str, Any]]:
     return out
 
 
+# ---------------- What-if comparisons ----------------
+def compare_formulas(people: Iterable[Dict[str, Any]], formulas: Sequence[FormulaRef]) -> Dict[str, Any]:
+    """
+    Score the same players under several formulas in one pass.
+
+    Returns {"formulas": [tags], "players": [{name/team/stats..., "impact": {tag: score}}]},
+    players sorted by the first formula's score.
+    """
+    people = list(people)
+    fs, kernel = compile_kernel(formulas)
+    tags = [f.tag for f in fs]
+    players = []
+    for p, scores in zip(people, kernel(_stat_row(p) for p in people)):
+        players.append({
+            "player_id": p.get("player_id", ""),
+            "name": _player_name(p.get("name", "")),
+            "team": _team_name(p.get("team", "")),
+            "runs": p.get("runs", 0),
+            "balls": p.get("balls", 0),
+            "wickets": p.get("wickets", 0),
+            "overs": p.get("overs", 0.0),
+            "impact": {t: round(scores[2 * i] + scores[2 * i + 1], 2) for i, t in enumerate(tags)},
+        })
+    if tags:
+        players.sort(key=lambda x: x["impact"][tags[0]], reverse=True)
+    return {"formulas": tags, "players": players}
+
+
+def compare_match_formulas(match_id: str, formulas: Sequence[FormulaRef]) -> Dict[str, Any]:
+    """compare_formulas() for one match's live/API scorecard."""
+    found = _match_players(match_id) if match_id else None
+    out = compare_formulas(found[1] if found else [], formulas)
+    out["match_id"] = match_id
+    return out
+
+
+def compare_stored_impacts(
+    formulas: Sequence[FormulaRef],
+    match_id: Optional[str] = None,
+    limit: int = 50,
+    save: bool = False,
+) -> Dict[str, Any]:
+    """
+    Re-score every stored player-match (or one match) under several formulas in a
+    single pass over `player_impacts`, and total them per player side by side.
+    With `save=True` the per-match rows are also stored under each formula's tag.
+    """
+    from db import models
+
+    fs, kernel = compile_kernel(formulas)
+    tags = [f.tag for f in fs]
+    totals: Dict[str, Dict[str, Any]] = {}
+    for chunk in models.iter_player_stats(match_id):
+        scores = kernel((r["runs"], r["balls"], r["wickets"], r["overs"]) for r in chunk)
+        saved = []
+        for r, sc in zip(chunk, scores):
+            t = totals.get(r["player_key"])
+            if t is None:
+                t = totals[r["player_key"]] = {"player_id": r["player_key"], "name": r["name"], "team": r["team"],
+                                               "matches": 0, "runs": 0, "wickets": 0,
+                                               "impact": dict.fromkeys(tags, 0.0)}
+            t["matches"] += 1
+            t["runs"] += r["runs"]
+            t["wickets"] += r["wickets"]
+            for i, tag in enumerate(tags):
+                bat, bowl = sc[2 * i], sc[2 * i + 1]
+                t["impact"][tag] += bat + bowl
+                if save:
+                    saved.append(dict(r, player_id=r["player_key"], role=_role(r), bat_impact=bat, bowl_impact=bowl,
+                                      impact_score=round(bat + bowl, 2), formula=tag))
+        if saved:
+            models.write_player_impacts(saved)
+
+    players = list(totals.values())
+    for t in players:
+        t["impact"] = {tag: round(v, 2) for tag, v in t["impact"].items()}
+    if tags:
+        players.sort(key=lambda x: x["impact"][tags[0]], reverse=True)
+    return {"formulas": tags, "match_id": match_id, "players": players[:limit] if limit else players}
+
+
 def summarize_impact(players: List[Dict[str, Any]]) -> Dict[str, Any]:
     if not players:
         return {"count": 0, "global_avg": 0.0, "team_avgs": {}}
@@ -0,0 +1,270 @@
+"""
+Impact formula registry.
+
+An impact formula is a pair of expressions over a player's match totals, one
+for batting and one for bowling; the impact score is their sum. Formulas are
+registered under a versioned tag ("classic@1") and compiled once into plain
+Python functions, so scoring a player costs the same as the hand-written
+`calculate_batting_impact` / `calculate_bowling_impact`. `compile_kernel()`
+fuses several formulas into a single loop, so one pass over stored stats
+scores every player under all of them side by side.
+
+Expressions may use:
+  runs, balls, wickets, overs      the player's totals (overs as decimal, 4.3 -> 4.5)
+  sr                               strike rate, 0 when no balls were faced
+  + - * /, unary -, comparisons, `a if cond else b`
+  min(), max(), abs(), ratio(a, b) ratio is a / b, or 0 when b is 0
+
+Division is only allowed by a non-zero constant; use ratio() for stat denominators.
+
+A registered tag always means the same expressions: to change a formula,
+register a new version. Impact rows, cache keys and stored results carry the
+tag they were computed with, so results from different formulas never mix.
+
+Configuration (environment variables, all optional):
+  CRICIMPACT_FORMULA          default formula tag (default: classic@1)
+  CRICIMPACT_FORMAT_FORMULAS  per-format defaults by matchType, e.g. "t20=t20@1,odi=classic@1"
+"""
+from __future__ import annotations
+
+import ast
+import os
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+# (runs, balls, wickets, overs)
+StatRow = Tuple[float, float, float, float]
+
+_VARIABLES = ("runs", "balls", "wickets", "overs", "sr")
+_SR = "sr = (runs / balls) * 100 if balls > 0 else 0.0"   # same as calculate_batting_impact
+
+
+def ratio(a: float, b: float) -> float:
+    return a / b if b else 0.0
+
+
+_FUNCTIONS: Dict[str, Callable] = {"min": min, "max": max, "abs": abs, "ratio": ratio}
+# name -> (min args, max args); min/max of a single number would need an iterable
+_ARITY: Dict[str, Tuple[int, Optional[int]]] = {"min": (2, None), "max": (2, None), "abs": (1, 1), "ratio": (2, 2)}
+_BIN_OPS = (ast.Add, ast.Sub, ast.Mult, ast.Div)
+_UNARY_OPS = (ast.UAdd, ast.USub)
+_CMP_OPS = (ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq)
+
+
+def _check_expression(expr: str) -> str:
+    """Validate a formula expression against the whitelist; returns it normalized."""
+    try:
+        tree = ast.parse(str(expr).strip(), mode="eval")
+    except SyntaxError as exc:
+        raise ValueError(f"invalid impact expression {expr!r}: {exc.msg}") from None
+
+    callees = {id(n.func) for n in ast.walk(tree) if isinstance(n, ast.Call)}
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Expression, ast.IfExp, ast.expr_context, ast.operator, ast.unaryop, ast.cmpop)):
+            continue
+        if isinstance(node, ast.BinOp) and isinstance(node.op, _BIN_OPS):
+            if isinstance(node.op, ast.Div) and not (
+                isinstance(node.right, ast.Constant) and type(node.right.value) in (int, float) and node.right.value
+            ):
+                raise ValueError(f"invalid impact expression {expr!r}: divide by a non-zero constant or use ratio()")
+            continue
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, _UNARY_OPS):
+            continue
+        if isinstance(node, ast.Compare) and all(isinstance(op, _CMP_OPS) for op in node.ops):
+            continue
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            continue
+        if isinstance(node, ast.Name) and (
+            node.id in _VARIABLES or (node.id in _FUNCTIONS and id(node) in callees)
+        ):
+            continue
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in _FUNCTIONS \
+                and not node.keywords and not any(isinstance(a, ast.Starred) for a in node.args):
+            lo, hi = _ARITY[node.func.id]
+            if len(node.args) < lo or (hi is not None and len(node.args) > hi):
+                want = (f"{lo}" if lo == hi else f"at least {lo}") + (" argument" if lo == 1 else " arguments")
+                raise ValueError(f"invalid impact expression {expr!r}: {node.func.id}() takes {want}")
+            continue
+        raise ValueError(f"invalid impact expression {expr!r}: {type(node).__name__} is not allowed")
+    return ast.unparse(tree.body)
+
+
+def _build(source: str, name: str) -> Callable:
+    # Only whitelisted expressions reach here, and they run without builtins
+    namespace: Dict[str, Any] = {"__builtins__": {}, "round": round, **_FUNCTIONS}
+    exec(compile(source, f"<impact {name}>", "exec"), namespace)
+    return namespace[name]
+
+
+class ImpactFormula:
+    """One registered formula: its tag, source expressions and compiled scorer."""
+
+    __slots__ = ("name", "version", "batting", "bowling", "formats", "description", "_score")
+
+    def __init__(
+        self,
+        name: str,
+        version: int,
+        batting: str,
+        bowling: str,
+        formats: Iterable[str] = (),
+        description: str = "",
+    ) -> None:
+        if not name or "@" in name:
+            raise ValueError(f"invalid impact formula name {name!r}")
+        self.name = name
+        self.version = int(version)
+        self.batting = _check_expression(batting)
+        self.bowling = _check_expression(bowling)
+        self.formats = tuple(str(f).lower() for f in formats)
+        self.description = description
+        self._score = _build(
+            f"def score(runs, balls, wickets, overs):\n"
+            f"    {_SR}\n"
+            f"    return round({self.batting}, 2), round({self.bowling}, 2)\n",
+            "score",
+        )
+        # Whitelisting catches almost everything; a trial run catches the rest at registration
+        # rather than inside impact_rows on a live page
+        try:
+            self._score(0.0, 0.0, 0.0, 0.0)
+            self._score(50.0, 30.0, 2.0, 4.5)
+        except Exception as exc:
+            raise ValueError(f"impact formula {self.tag} fails to evaluate: {exc}") from None
+
+    @property
+    def tag(self) -> str:
+        return f"{self.name}@{self.version}"
+
+    def score(self, runs: float, balls: float, wickets: float, overs: float) -> Tuple[float, float]:
+        """(bat impact, bowl impact) for one player's totals."""
+        return self._score(float(runs or 0), float(balls or 0), float(wickets or 0), float(overs or 0))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"tag": self.tag, "name": self.name, "version": self.version, "batting": self.batting,
+                "bowling": self.bowling, "formats": list(self.formats), "description": self.description}
+
+
+# ---------------- Registry ----------------
+_REGISTRY: Dict[str, ImpactFormula] = {}
+_LATEST: Dict[str, str] = {}      # name -> tag of its highest version
+_BY_FORMAT: Dict[str, str] = {}   # matchType -> tag
+
+DEFAULT_FORMULA = os.getenv("CRICIMPACT_FORMULA", "classic@1")
+
+FormulaRef = Union[str, ImpactFormula, None]
+
+
+def register_formula(
+    name: str,
+    version: int,
+    batting: str,
+    bowling: str,
+    formats: Iterable[str] = (),
+    description: str = "",
+) -> ImpactFormula:
+    """
+    Compile and register a formula. `formats` makes it the default for those
+    matchTypes ("t20", "odi", "test", ...). Re-registering a tag with the same
+    expressions is a no-op; with different ones it's an error.
+    """
+    formula = ImpactFormula(name, version, batting, bowling, formats, description)
+    existing = _REGISTRY.get(formula.tag)
+    if existing is not None:
+        if (existing.batting, existing.bowling) != (formula.batting, formula.bowling):
+            raise ValueError(f"impact formula {formula.tag} already exists; register a new version instead")
+        return existing
+    _REGISTRY[formula.tag] = formula
+    latest = _LATEST.get(name)
+    if latest is None or _REGISTRY[latest].version < formula.version:
+        _LATEST[name] = formula.tag
+    for fmt in formula.formats:
+        _BY_FORMAT[fmt] = formula.tag
+    return formula
+
+
+def get_formula(ref: FormulaRef = None, match_type: Optional[str] = None) -> ImpactFormula:
+    """
+    Look up a formula by tag ("classic@1"), or by bare name for its latest
+    version. Without one, use the default for `match_type`, else DEFAULT_FORMULA.
+    """
+    if isinstance(ref, ImpactFormula):
+        return ref
+    tag = str(ref or "").strip() or _BY_FORMAT.get(str(match_type or "").lower()) or DEFAULT_FORMULA
+    tag = tag if "@" in tag else _LATEST.get(tag, tag)
+    formula = _REGISTRY.get(tag)
+    if formula is None:
+        raise ValueError(f"unknown impact formula {tag!r}")
+    return formula
+
+
+def list_formulas() -> List[Dict[str, Any]]:
+    return [f.as_dict() for f in sorted(_REGISTRY.values(), key=lambda f: (f.name, f.version))]
+
+
+def selection_key(ref: FormulaRef = None) -> str:
+    """
+    Cache-key component for what `get_formula(ref, match_type)` can return.
+    Explicit refs resolve to their tag; the automatic choice also depends on
+    the per-format defaults.
+    """
+    if ref:
+        return get_formula(ref).tag
+    by_format = ",".join(f"{k}={v}" for k, v in sorted(_BY_FORMAT.items()))
+    return f"{get_formula().tag};{by_format}" if by_format else get_formula().tag
+
+
+# ---------------- Batch scoring ----------------
+@lru_cache(maxsize=64)
+def _kernel(tags: Tuple[str, ...]) -> Callable[[Iterable[StatRow]], List[Tuple[float, ...]]]:
+    terms = []
+    for tag in tags:
+        f = _REGISTRY[tag]
+        terms.append(f"round({f.batting}, 2)")
+        terms.append(f"round({f.bowling}, 2)")
+    return _build(
+        "def kernel(rows):\n"
+        "    out = []\n"
+        "    append = out.append\n"
+        "    for runs, balls, wickets, overs in rows:\n"
+        f"        {_SR}\n"
+        f"        append(({', '.join(terms)},))\n"
+        "    return out\n",
+        "kernel",
+    )
+
+
+def compile_kernel(
+    refs: Sequence[FormulaRef],
+) -> Tuple[List[ImpactFormula], Callable[[Iterable[StatRow]], List[Tuple[float, ...]]]]:
+    """
+    Fuse several formulas into one scoring loop. The kernel takes numeric
+    (runs, balls, wickets, overs) rows and returns, per row, a flat tuple
+    (bat_0, bowl_0, bat_1, bowl_1, ...) in the order of `refs`.
+    """
+    formulas = [get_formula(r) for r in refs]
+    return formulas, _kernel(tuple(f.tag for f in formulas))
+
+
+def _load_format_defaults(spec: str) -> None:
+    for part in spec.split(","):
+        fmt, _, tag = part.partition("=")
+        if fmt.strip() and tag.strip():
+            _BY_FORMAT[fmt.strip().lower()] = get_formula(tag.strip()).tag
+
+
+# ---------------- Built-in formulas ----------------
+register_formula(
+    "classic", 1,
+    batting="runs * 0.4 + sr * 0.6",
+    bowling="wickets * 8 + (10 - overs)",
+    description="The original Cric Impact weighting (calculate_batting_impact / calculate_bowling_impact).",
+)
+register_formula(
+    "t20", 1,
+    batting="runs * 0.3 + sr * 0.7",
+    bowling="wickets * 10 + max(0, 4 - overs) * 2",
+    description="Strike-rate-heavy variant for short formats; opt in via CRICIMPACT_FORMAT_FORMULAS.",
+)
+
+_load_format_defaults(os.getenv("CRICIMPACT_FORMAT_FORMULAS", ""))
@@ -0,0 +1,201 @@
+"""
+Player identity index.
+
+Scorecards name the same person in different ways (provider id, "V Kohli" vs
+"Virat Kohli ", bowling rows without a team, ...). The index maps every alias
+we've seen to one canonical player id, so normalization can key players with
+plain dict lookups and cross-match aggregation can GROUP BY that id.
+
+Aliases:
+  id:<provider id>          strongest; always wins
+  tn:<team>|<name>          normalized team + name
+  n:<name>                  name only; marked ambiguous ("") once two players share it
+  ti:<team>|<initial> <surname>
+                            "v kohli" for both "V Kohli" and "Virat Kohli" in one team;
+                            only links names whose given names fit ("v", "ms" vs
+                            "mahendra singh"), and is marked ambiguous once two players
+                            with different full names share it
+"""
+from __future__ import annotations
+
+import re
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_AMBIGUOUS = ""
+_PUNCT = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_name(value: str) -> str:
+    """'  Virat  Kohli (c)†' -> 'virat kohli c'. Accents are folded, case and punctuation dropped."""
+    s = unicodedata.normalize("NFKD", str(value or ""))
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    s = _PUNCT.sub(" ", s.lower())
+    return _SPACES.sub(" ", s).strip()
+
+
+def initial_form(nn: str) -> str:
+    """'virat kohli' / 'v kohli' -> 'v kohli' (normalized input); '' for one-word names."""
+    parts = nn.split()
+    return f"{parts[0][0]} {parts[-1]}" if len(parts) > 1 else ""
+
+
+def _given_names_fit(a: str, b: str) -> bool:
+    """Can normalized names a and b, which share an initial form, be the same player?"""
+    ga, gb = a.split()[:-1], b.split()[:-1]
+    if ga == gb:
+        return True
+    # One side must be initials only ("v", "ms", "m s") spelling out the other's given names
+    for short, full in ((ga, gb), (gb, ga)):
+        if all(len(t) <= 2 for t in short) and "".join(t[0] for t in full).startswith("".join(short)):
+            return True
+    return False
+
+
+class PlayerIdentityIndex:
+    """
+    In-memory alias -> canonical id map. `resolve()` is a handful of dict
+    lookups; new aliases are queued and written by `flush()` when the index
+    is persistent (see `get_identity_index`). Safe to share between threads:
+    the shared index is resolved into from concurrent request handlers.
+    """
+
+    def __init__(
+        self,
+        aliases: Optional[Dict[str, str]] = None,
+        teams: Optional[Dict[str, str]] = None,
+        names: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self._aliases: Dict[str, str] = dict(aliases or {})
+        self._teams: Dict[str, str] = dict(teams or {})   # canonical id -> normalized team ("" = unknown)
+        self._names: Dict[str, str] = dict(names or {})   # canonical id -> display name
+        self._new_aliases: Dict[str, str] = {}
+        self._new_players: Dict[str, Tuple[str, str]] = {}
+        self._lock = threading.RLock()
+
+    # ---- lookups ----
+    def _set_alias(self, alias: str, cid: str) -> None:
+        if self._aliases.get(alias) != cid:
+            self._aliases[alias] = cid
+            self._new_aliases[alias] = cid
+
+    def _claim_alias(self, alias: str, cid: str) -> None:
+        """Set a shared alias (n:, ti:), or mark it ambiguous if another player holds it."""
+        prev = self._aliases.get(alias)
+        if prev is None:
+            self._set_alias(alias, cid)
+        elif prev not in (cid, _AMBIGUOUS):
+            self._set_alias(alias, _AMBIGUOUS)
+
+    def resolve(self, name: str, team: str = "", provider_id: str = "") -> str:
+        """Canonical id for a player reference, registering it if unseen."""
+        nn = normalize_name(name)
+        nt = normalize_name(team)
+        pid = str(provider_id or "").strip()
+        with self._lock:
+            return self._resolve(name, nn, nt, pid)
+
+    def _resolve(self, name: str, nn: str, nt: str, pid: str) -> str:
+        cid = self._aliases.get(f"id:{pid}") if pid else None
+        if not cid and nt:
+            cid = self._aliases.get(f"tn:{nt}|{nn}")
+        if not cid:
+            cand = self._aliases.get(f"n:{nn}")
+            # Same name is only the same player if the teams don't contradict
+            if cand and (not nt or self._teams.get(cand, "") in ("", nt)):
+                cid = cand
+        initial = initial_form(nn) if nt else ""
+        upgraded = False
+        if not cid and initial:
+            cand = self._aliases.get(f"ti:{nt}|{initial}")
+            known = normalize_name(self._names.get(cand, "")) if cand else ""
+            if cand and _given_names_fit(nn, known):
+                cid = cand
+                # "V Kohli" becomes "Virat Kohli" once the full name shows up
+                if len(nn) > len(known):
+                    self._names[cid] = str(name or "").strip()
+                    upgraded = True
+        if not cid:
+            cid = f"pid:{pid}" if pid else f"{nt}::{nn}"
+
+        if upgraded or cid not in self._names or (nt and not self._teams.get(cid)):
+            self._names.setdefault(cid, str(name or "").strip())
+            if nt:
+                self._teams[cid] = nt
+            else:
+                self._teams.setdefault(cid, "")
+            self._new_players[cid] = (self._names[cid], self._teams[cid])
+
+        if pid:
+            self._set_alias(f"id:{pid}", cid)
+        if nt and nn:
+            self._set_alias(f"tn:{nt}|{nn}", cid)
+        if nn:
+            self._claim_alias(f"n:{nn}", cid)
+        if initial:
+            self._claim_alias(f"ti:{nt}|{initial}", cid)
+        return cid
+
+    def resolve_many(self, refs: Iterable[Tuple[str, str, str]]) -> List[str]:
+        """Bulk resolve (name, team, provider_id) tuples, e.g. for a backfill batch."""
+        resolve = self.resolve
+        with self._lock:   # one acquisition per batch; the lock is re-entrant
+            return [resolve(name, team, pid) for name, team, pid in refs]
+
+    def name_of(self, cid: str) -> str:
+        return self._names.get(cid, "")
+
+    # ---- persistence ----
+    @property
+    def dirty(self) -> bool:
+        return bool(self._new_aliases or self._new_players)
+
+    def flush(self) -> None:
+        """Write queued aliases/players to SQLite and adopt any that another process stored first."""
+        from db.models import save_player_identities
+
+        # Take the pending writes atomically; anything resolved meanwhile is queued for the next flush
+        with self._lock:
+            if not self.dirty:
+                return
+            aliases, self._new_aliases = self._new_aliases, {}
+            players, self._new_players = self._new_players, {}
+        try:
+            stored = save_player_identities(
+                list(aliases.items()),
+                [(c, n, t) for c, (n, t) in players.items()],
+            )
+        except Exception:
+            with self._lock:   # put them back (newer values win) so they're retried
+                self._new_aliases = {**aliases, **self._new_aliases}
+                self._new_players = {**players, **self._new_players}
+            raise
+        with self._lock:
+            self._aliases.update(stored)
+
+    @classmethod
+    def load(cls) -> "PlayerIdentityIndex":
+        from db.models import load_player_identities
+
+        aliases, players = load_player_identities()
+        return cls(
+            aliases,
+            teams={cid: team for cid, (_, team) in players.items()},
+            names={cid: name for cid, (name, _) in players.items()},
+        )
+
+
+_shared: Optional[PlayerIdentityIndex] = None
+
+
+def get_identity_index() -> PlayerIdentityIndex:
+    """Process-wide persistent index, loaded from SQLite on first use."""
+    global _shared
+    if _shared is None:
+        try:
+            _shared = PlayerIdentityIndex.load()
+        except Exception:
+            _shared = PlayerIdentityIndex()  # DB not initialized yet; still dedupe in memory
+    return _shared
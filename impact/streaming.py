@@ -0,0 +1,233 @@
+"""
+Ball-by-ball impact engine.
+
+`calculator.py` scores a match from end-of-innings aggregates. This module
+keeps the same per-player aggregates up to date one delivery at a time, so a
+live match can be scored as it happens and charted over by over. Impact is
+computed with the same compiled formula (impact/formulas.py) the calculator
+uses, which means a snapshot taken after any ball matches what
+`calculate_impact_from_details` would return for a scorecard with the same totals.
+
+A delivery is a plain dict:
+
+    {
+        "innings": 1,                      # optional, defaults to 1
+        "batter": "V Kohli",               # str or player dict
+        "bowler": "J Anderson",
+        "batting_team": "India",           # optional
+        "bowling_team": "England",         # optional
+        "runs": 4,                         # off the bat
+        "extra_type": "wide",              # wide / noball / bye / legbye / None
+        "wicket": {"kind": "caught"},      # or True / "bowled" / None
+    }
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from impact.calculator import _i, _player_id, _player_name, _team_name, impact_rows
+from impact.formulas import FormulaRef, ImpactFormula, get_formula
+from impact.identity import PlayerIdentityIndex, get_identity_index
+
+# Dismissals that don't count towards the bowler's wickets
+_NOT_BOWLER_WICKETS = {
+    "run out", "runout", "retired hurt", "retired out", "retired", "obstructing the field", "timed out",
+}
+
+# (innings, over number within the innings (1-based), bat impact, bowl impact, total impact)
+TimelinePoint = Tuple[int, int, float, float, float]
+
+
+class _PlayerState:
+    """Running totals for one player. Slots keep hundreds of live matches cheap."""
+
+    __slots__ = ("player_id", "provider_id", "name", "team", "runs", "balls", "wickets", "legal_balls",
+                 "bat", "bowl", "timeline")
+
+    def __init__(self, player_id: str, name: str, team: str, formula: ImpactFormula) -> None:
+        self.player_id = player_id
+        self.provider_id = ""
+        self.name = name
+        self.team = team
+        self.runs = 0
+        self.balls = 0
+        self.wickets = 0
+        self.legal_balls = 0  # bowled
+        self.bat, self.bowl = formula.score(0, 0, 0, 0)
+        self.timeline: List[TimelinePoint] = []
+
+    @property
+    def overs(self) -> float:
+        return self.legal_balls / 6.0
+
+    def rescore(self, formula: ImpactFormula) -> None:
+        self.bat, self.bowl = formula.score(self.runs, self.balls, self.wickets, self.overs)
+
+    def as_stats(self) -> Dict[str, Any]:
+        return {"player_id": self.player_id, "provider_id": self.provider_id, "name": self.name,
+                "team": self.team, "runs": self.runs, "balls": self.balls, "wickets": self.wickets,
+                "overs": self.overs}
+
+
+def _wicket_kind(wicket: Any) -> Optional[str]:
+    if not wicket:
+        return None
+    if isinstance(wicket, dict):
+        return str(wicket.get("kind") or wicket.get("type") or "out").lower()
+    if isinstance(wicket, str):
+        return wicket.lower()
+    return "out"
+
+
+class MatchImpactStream:
+    """
+    Incremental impact for one match. `feed()` is O(1) per delivery: it only
+    touches the batter and bowler involved and rescores just those two.
+    When an over completes, every player touched during it gets one timeline
+    point; players without a point for an over simply didn't change.
+
+    Players are keyed by canonical player id from `identities` (the shared
+    index by default), exactly like `_normalize_from_scorecard`, so a bowler
+    fed without `bowling_team` is still the same player as their batting rows.
+    """
+
+    __slots__ = ("match_id", "formula", "identities", "players", "innings", "over_balls", "overs_done",
+                 "_touched", "_keys")
+
+    def __init__(
+        self,
+        match_id: str = "",
+        formula: FormulaRef = None,
+        identities: Optional[PlayerIdentityIndex] = None,
+    ) -> None:
+        self.match_id = match_id
+        self.formula = get_formula(formula)
+        self.identities = identities if identities is not None else get_identity_index()
+        self.players: Dict[str, _PlayerState] = {}
+        self.innings = 1
+        self.over_balls = 0   # legal balls in the current over
+        self.overs_done = 0   # completed overs in the current innings
+        self._touched: Dict[str, _PlayerState] = {}
+        self._keys: Dict[Tuple[str, str, str], str] = {}   # (name, team, provider id) -> canonical id
+
+    # ---- state ----
+    def _player(self, ref: Any, team: Any) -> Tuple[str, _PlayerState]:
+        name = _player_name(ref)
+        team = _team_name(team)
+        pid = _player_id(ref)
+        key = self._keys.get((name, team, pid))
+        if key is None:
+            key = self._keys[(name, team, pid)] = self.identities.resolve(name, team, pid)
+        st = self.players.get(key)
+        if st is None:
+            st = self.players[key] = _PlayerState(key, name, team, self.formula)
+        elif team and not st.team:
+            st.team = team   # first seen without a team (e.g. bowling), same as _combine
+        if pid and not st.provider_id:
+            st.provider_id = pid
+        return key, st
+
+    def _close_over(self, complete: bool) -> Optional[Dict[str, Any]]:
+        over = self.overs_done + 1
+        if complete:
+            self.overs_done, self.over_balls = over, 0
+        if not self._touched:
+            return None
+        changed = {}
+        for key, st in self._touched.items():
+            total = round(st.bat + st.bowl, 2)
+            st.timeline.append((self.innings, over, st.bat, st.bowl, total))
+            changed[key] = total
+        self._touched = {}
+        return {"match_id": self.match_id, "innings": self.innings, "over": over, "impact": changed}
+
+    # ---- feeding ----
+    def feed(self, delivery: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply one delivery. Returns an over summary when this ball completes an over."""
+        innings = _i(delivery.get("innings")) or 1
+        closed = None
+        if innings != self.innings:
+            closed = self._close_over(complete=False)
+            self.innings, self.overs_done, self.over_balls = innings, 0, 0
+
+        extra = str(delivery.get("extra_type") or "").lower().replace("-", "").replace(" ", "")
+        wide = extra in ("wide", "wides", "wd")
+        noball = extra in ("noball", "noballs", "nb")
+
+        bkey, batter = self._player(delivery.get("batter") or delivery.get("batsman"),
+                                    delivery.get("batting_team", ""))
+        wkey, bowler = self._player(delivery.get("bowler"), delivery.get("bowling_team", ""))
+
+        if not wide:
+            batter.runs += _i(delivery.get("runs"))
+            batter.balls += 1   # no-balls count as faced, wides don't
+            batter.rescore(self.formula)
+            self._touched[bkey] = batter
+
+        kind = _wicket_kind(delivery.get("wicket"))
+        if kind and kind not in _NOT_BOWLER_WICKETS:
+            bowler.wickets += 1
+        if not (wide or noball):
+            bowler.legal_balls += 1
+            self.over_balls += 1
+        bowler.rescore(self.formula)
+        self._touched[wkey] = bowler
+
+        if self.over_balls >= 6:
+            return self._close_over(complete=True)
+        return closed
+
+    def consume(self, deliveries: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Feed a delivery generator, yielding an over summary as each over completes."""
+        for d in deliveries:
+            summary = self.feed(d)
+            if summary:
+                yield summary
+
+    def finish(self) -> Optional[Dict[str, Any]]:
+        """Close a part-finished over (end of innings/match or a paused feed)."""
+        return self._close_over(complete=False)
+
+    # ---- reading ----
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Current per-player impact rows, same shape as calculate_impact_for_match."""
+        return impact_rows((st.as_stats() for st in self.players.values()), self.formula)
+
+    def timeline(self, player_key: str) -> List[TimelinePoint]:
+        st = self.players.get(player_key)
+        return list(st.timeline) if st else []
+
+    def timelines(self) -> Dict[str, List[TimelinePoint]]:
+        return {k: list(st.timeline) for k, st in self.players.items()}
+
+
+class LiveImpactStreams:
+    """Keeps one MatchImpactStream per live match so a single process can follow many at once."""
+
+    def __init__(self, formula: FormulaRef = None, identities: Optional[PlayerIdentityIndex] = None) -> None:
+        self.formula = get_formula(formula)
+        self.identities = identities if identities is not None else get_identity_index()
+        self._streams: Dict[str, MatchImpactStream] = {}
+
+    def get(self, match_id: str) -> MatchImpactStream:
+        s = self._streams.get(match_id)
+        if s is None:
+            s = self._streams[match_id] = MatchImpactStream(match_id, self.formula, self.identities)
+        return s
+
+    def feed(self, match_id: str, delivery: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return self.get(match_id).feed(delivery)
+
+    def close(self, match_id: str) -> Optional[MatchImpactStream]:
+        """Stop following a match; returns its stream (with timelines) for archiving."""
+        s = self._streams.pop(match_id, None)
+        if s is not None:
+            s.finish()
+            try:
+                self.identities.flush()
+            except Exception:
+                pass  # unsaved aliases are retried on the next flush
+        return s
+
+    def __len__(self) -> int:
+        return len(self._streams)
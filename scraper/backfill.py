@@ -0,0 +1,273 @@
+"""
+Offline backfill of historical scorecards into the local SQLite DB.
+
+Reads one-match-per-file scorecard JSON (the same payload shape that
+`services.cricket_api.get_match_details` returns, or the raw API envelope)
+from a directory, .zip or .tar(.gz) archive, scores each match with
+`impact.calculator` on a process pool, and writes matches + per-player impact
+in batched transactions. Every committed file is checkpointed, so re-running
+the same command resumes where the last run stopped.
+
+    python -m scraper.backfill path/to/scorecards/ --workers 8
+    python -m scraper.backfill season-2024.tar.gz --batch-size 500
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tarfile
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from db import models
+from impact.calculator import _combine, _team_name, calculate_impact_from_details, impact_rows
+from impact.formulas import get_formula
+from impact.identity import PlayerIdentityIndex
+
+# An item is (name, payload): payload is a file path for directories (the worker
+# reads it) or the raw bytes for archive members (archives can't be shared).
+Item = Tuple[str, Union[str, bytes]]
+
+
+# ---------------- Input streaming ----------------
+def _iter_directory(root: Path) -> Iterator[Item]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for fn in sorted(filenames):
+            if fn.lower().endswith(".json"):
+                full = os.path.join(dirpath, fn)
+                yield os.path.relpath(full, root), full
+
+
+def _iter_zip(path: Path) -> Iterator[Item]:
+    with zipfile.ZipFile(path) as zf:
+        for info in zf.infolist():
+            if not info.is_dir() and info.filename.lower().endswith(".json"):
+                yield info.filename, zf.read(info)
+
+
+def _iter_tar(path: Path) -> Iterator[Item]:
+    # "r|*" reads the archive as a stream, so compressed tarballs aren't seeked/indexed
+    with tarfile.open(path, mode="r|*") as tf:
+        for member in tf:
+            if member.isfile() and member.name.lower().endswith(".json"):
+                fh = tf.extractfile(member)
+                if fh is not None:
+                    yield member.name, fh.read()
+
+
+def iter_scorecard_files(path: Union[str, Path]) -> Iterator[Item]:
+    """Lazily yield (name, payload) for every .json scorecard under `path`."""
+    path = Path(path)
+    if path.is_dir():
+        return _iter_directory(path)
+    if zipfile.is_zipfile(path):
+        return _iter_zip(path)
+    if tarfile.is_tarfile(path):
+        return _iter_tar(path)
+    if path.suffix.lower() == ".json":
+        return iter([(path.name, str(path))])
+    raise ValueError(f"Don't know how to read scorecards from {path}")
+
+
+def _chunked(items: Iterable[Item], size: int) -> Iterator[List[Item]]:
+    chunk: List[Item] = []
+    for it in items:
+        chunk.append(it)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ---------------- Per-file work (runs in worker processes) ----------------
+def _format_score(score: Any) -> str:
+    """CricAPI 'score' list -> 'Inning 1 287/4 (47.3), ...' like the seeded samples."""
+    if not isinstance(score, list):
+        return str(score or "")
+    parts = []
+    for s in score:
+        if isinstance(s, dict):
+            parts.append(f"{s.get('inning', '')} {s.get('r', 0)}/{s.get('w', 0)} ({s.get('o', 0)})".strip())
+    return ", ".join(parts)
+
+
+def _match_row(details: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Map a match-details payload to a `matches` row (same fields as insert_live_match)."""
+    match_id = details.get("id") or details.get("unique_id") or details.get("match_id")
+    if not match_id:
+        return None
+    teams = details.get("teams") or []
+    if not teams and details.get("teamInfo"):
+        teams = [ti.get("name", "") for ti in details.get("teamInfo", []) if isinstance(ti, dict)]
+    teams = [_team_name(t) for t in teams]
+    toss = _team_name(details.get("tossWinner", ""))
+    if toss and details.get("tossChoice"):
+        toss = f"{toss} ({str(details['tossChoice']).title()})"
+    return {
+        "match_id": str(match_id),
+        "team1": teams[0] if len(teams) > 0 else "",
+        "team2": teams[1] if len(teams) > 1 else "",
+        "status": details.get("status", "") or "",
+        "score": _format_score(details.get("score")),
+        "series": details.get("series") or details.get("name", "") or "",
+        "venue": details.get("venue", "") or "",
+        "date": details.get("date") or details.get("dateTimeGMT") or "",
+        "toss": toss,
+        "winner": _team_name(details.get("matchWinner", "")),
+    }
+
+
+def _process_item(name: str, payload: Union[str, bytes], formula: Optional[str] = None):
+    """Parse + score one file. Returns (name, match, players, error)."""
+    try:
+        if isinstance(payload, str):
+            with open(payload, "rb") as fh:
+                payload = fh.read()
+        details = json.loads(payload)
+        # Accept both the raw API envelope and the bare `data` object
+        if isinstance(details, dict) and isinstance(details.get("data"), dict) and "status" in details:
+            details = details["data"]
+        if not isinstance(details, dict):
+            return name, None, [], "not a JSON object"
+        match = _match_row(details)
+        players = calculate_impact_from_details(details, formula=formula) if match else []
+        return name, match, players, None
+    except Exception as exc:  # bad file shouldn't take the whole run down
+        return name, None, [], f"{type(exc).__name__}: {exc}"
+
+
+def _merge_by_player_id(players: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Rows of one match that map onto the same canonical id are one player (e.g. a
+    batting row by name and a bowling row by provider id): add their stats up and
+    rescore, instead of letting the second row overwrite the first on upsert.
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for p in players:
+        key = p["player_id"]
+        merged[key] = _combine(merged[key], p) if key in merged else dict(p)
+    if len(merged) == len(players):
+        return players
+    return impact_rows(merged.values(), players[0].get("formula"))
+
+
+# ---------------- Driver ----------------
+def run_backfill(
+    path: Union[str, Path],
+    workers: Optional[int] = None,
+    batch_size: int = 200,
+    source: Optional[str] = None,
+    resume: bool = True,
+    formula: Optional[str] = None,
+) -> Dict[str, int]:
+    """
+    Load every scorecard under `path`. Memory stays bounded by `batch_size`
+    plus a small window of in-flight files, regardless of how many matches
+    the source holds. Files that fail to parse are reported and left
+    unchecked, so they're retried on the next run. `formula` scores every match
+    with that formula tag instead of the per-format default.
+    """
+    Path(models.DB_PATH).parent.mkdir(parents=True, exist_ok=True)
+    models.init_db(reset=False)
+    identities = PlayerIdentityIndex.load()
+    if formula:
+        formula = get_formula(formula).tag   # fail fast on a typo, before any work is queued
+
+    source = source or str(Path(path).resolve())
+    workers = workers or os.cpu_count() or 1
+    window = workers * 4
+    stats = {"seen": 0, "skipped": 0, "loaded": 0, "empty": 0, "failed": 0}
+
+    pending_batch: List[Tuple[str, Optional[Dict[str, Any]], List[Dict[str, Any]]]] = []
+    inflight = set()
+
+    def collect(futures) -> None:
+        for fut in futures:
+            name, match, players, error = fut.result()
+            if error:
+                stats["failed"] += 1
+                print(f"⚠️  {name}: {error}", file=sys.stderr)
+                continue
+            stats["loaded" if match else "empty"] += 1
+            pending_batch.append((name, match, players))
+        if len(pending_batch) >= batch_size:
+            flush()
+
+    def flush() -> None:
+        # Workers only dedupe within a match; map everyone onto the persistent
+        # canonical ids here, in one pass per batch, and merge rows that turn out
+        # to be the same player before they're written.
+        players = [p for _, _, ps in pending_batch for p in ps]
+        ids = identities.resolve_many((p["name"], p["team"], p.get("provider_id", "")) for p in players)
+        for p, cid in zip(players, ids):
+            p["player_id"] = cid
+        identities.flush()
+        models.write_backfill_batch(
+            source, [(name, match, _merge_by_player_id(ps)) for name, match, ps in pending_batch]
+        )
+        pending_batch.clear()
+
+    started = time.monotonic()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in _chunked(iter_scorecard_files(path), batch_size):
+            stats["seen"] += len(chunk)
+            names = [n for n, _ in chunk]
+            todo = set(models.filter_pending_backfill(source, names)) if resume else set(names)
+            for name, payload in chunk:
+                if name not in todo:
+                    stats["skipped"] += 1
+                    continue
+                if len(inflight) >= window:
+                    done, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                inflight.add(pool.submit(_process_item, name, payload, formula))
+        collect(inflight)
+        inflight = set()
+    flush()
+
+    stats["seconds"] = round(time.monotonic() - started, 1)
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(
+        prog="python -m scraper.backfill",
+        description="Backfill historical scorecard JSON (dir, .zip or .tar[.gz]) into the local DB.",
+    )
+    ap.add_argument("path", help="directory or archive of one-match-per-file scorecard JSON")
+    ap.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    ap.add_argument("--batch-size", type=int, default=200, help="matches per DB transaction")
+    ap.add_argument("--source", default=None, help="checkpoint name (default: absolute path of PATH)")
+    ap.add_argument("--no-resume", action="store_true", help="reprocess files even if already checkpointed")
+    ap.add_argument("--formula", default=None, help="impact formula tag, e.g. classic@1 (default: per-format default)")
+    ap.add_argument("--db", default=None, help=f"SQLite file (default: {models.DB_PATH})")
+    args = ap.parse_args(argv)
+
+    if args.db:
+        models.DB_PATH = args.db
+
+    stats = run_backfill(
+        args.path,
+        workers=args.workers,
+        batch_size=max(1, args.batch_size),
+        source=args.source,
+        resume=not args.no_resume,
+        formula=args.formula,
+    )
+    print(
+        f"✅ Backfill done in {stats['seconds']}s: {stats['loaded']} loaded, "
+        f"{stats['empty']} without match id, {stats['skipped']} already done, {stats['failed']} failed "
+        f"({stats['seen']} files seen)."
+    )
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,49 +1,138 @@
 from __future__ import annotations
 
+import json
 import os
+import sys
 import requests
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlencode
+
+from services.shared_cache import get_cache
 
 API_KEY = os.getenv("CRICKET_API_KEY")  # optional
 BASE_URL = "https://api.cricapi.com/v1"
 
+# Seconds a successful response is shared across all app workers before refetching
+API_CACHE_TTL = float(os.getenv("CRICKET_API_CACHE_TTL", "30"))
 
-def _request(path: str, **params) -> Optional[dict]:
+# currentMatches paging: offsets step by the first page's row count (25 today).
+# Pages after the first are fetched in parallel; the cap bounds upstream hits per
+# refresh, and matches past it are dropped with a warning.
+LIVE_MAX_PAGES = int(os.getenv("CRICKET_API_MAX_PAGES", "10"))
+LIVE_PAGE_WORKERS = 4
+
+_truncation_warned: Optional[int] = None   # last total warned about, so each refresh doesn't repeat it
+
+
+def _fetch(path: str, object_pairs_hook: Optional[Callable] = None, **params) -> Optional[dict]:
     """Call CricAPI and return parsed JSON, or None if unavailable."""
-    if not API_KEY:
-        return None
     url = f"{BASE_URL}/{path}"
     params = {"apikey": API_KEY, **params}
     try:
         r = requests.get(url, params=params, timeout=12)
         r.raise_for_status()
-        return r.json()
+        return json.loads(r.content, object_pairs_hook=object_pairs_hook)
     except Exception:
         return None
 
 
-def get_live_matches() -> List[Dict[str, Any]]:
-    """Return normalized list of current matches. Empty list if no key/error."""
-    payload = _request("currentMatches", offset=0)
+def _request(path: str, **params) -> Optional[dict]:
+    """
+    Cached CricAPI call. Responses live in the shared cache, so N app workers
+    make one upstream request per endpoint+params per TTL, not N. Only
+    'success' payloads are cached; errors are retried on the next call.
+    """
+    if not API_KEY:
+        return None
+    key = f"api:{path}?{urlencode(sorted(params.items()))}"   # never includes the API key
+    return get_cache().get_or_compute(
+        key,
+        lambda: _fetch(path, **params),
+        ttl=API_CACHE_TTL,
+        cache_if=lambda p: isinstance(p, dict) and p.get("status") == "success",
+    )
+
+
+# Every key get_live_matches reads, at any depth (envelope, info, match, teamInfo).
+# Everything else (scores, images, fantasy flags, ...) is dropped while parsing.
+_LIVE_FIELDS = frozenset({
+    "status", "data", "info", "totalRows",
+    "id", "unique_id", "name", "teams", "teamInfo", "venue", "date", "dateTimeGMT", "tossWinner", "matchWinner",
+})
+
+
+def _project_live(pairs: List[tuple]) -> Dict[str, Any]:
+    return {k: v for k, v in pairs if k in _LIVE_FIELDS}
+
+
+def _live_record(m: Dict[str, Any]) -> Dict[str, Any]:
+    teams = m.get("teams") or []
+    if not teams and m.get("teamInfo"):
+        teams = [ti.get("name", "") for ti in m.get("teamInfo", [])]
+    name = m.get("name") or (" vs ".join([t for t in teams if t]) or "Match")
+    return {
+        "id": m.get("id") or m.get("unique_id") or name,
+        "name": name,
+        "status": m.get("status", ""),
+        "teams": teams,
+        "venue": m.get("venue", ""),
+        "date": m.get("date") or m.get("dateTimeGMT") or "",
+        "tossWinner": m.get("tossWinner"),
+        "matchWinner": m.get("matchWinner"),
+    }
+
+
+def _fetch_live_page(offset: int) -> Optional[Dict[str, Any]]:
+    """One currentMatches page as {"total", "matches": [compact records]}, or None on error."""
+    payload = _fetch("currentMatches", object_pairs_hook=_project_live, offset=offset)
     if not payload or payload.get("status") != "success":
+        return None
+    rows = payload.get("data") or []
+    total = (payload.get("info") or {}).get("totalRows")
+    try:
+        total = int(total)
+    except (TypeError, ValueError):
+        total = offset + len(rows)
+    return {"total": total, "matches": [_live_record(m) for m in rows if isinstance(m, dict)]}
+
+
+def _live_page(offset: int) -> Optional[Dict[str, Any]]:
+    # Only the projected records are cached, never the raw page
+    return get_cache().get_or_compute(
+        f"api:currentMatches:page:{offset}", lambda: _fetch_live_page(offset), ttl=API_CACHE_TTL
+    )
+
+
+def get_live_matches() -> List[Dict[str, Any]]:
+    """Return normalized list of current matches (all pages). Empty list if no key/error."""
+    if not API_KEY:
+        return []
+    first = _live_page(0)
+    if not first:
         return []
 
+    global _truncation_warned
+    step = len(first["matches"])
+    limit = step * LIVE_MAX_PAGES
+    offsets = list(range(step, min(first["total"], limit), step)) if step else []
+    if step and first["total"] > limit and _truncation_warned != first["total"]:
+        _truncation_warned = first["total"]
+        print(f"⚠️  currentMatches: showing {limit} of {first['total']} matches; "
+              f"raise CRICKET_API_MAX_PAGES (now {LIVE_MAX_PAGES}) to see the rest", file=sys.stderr)
+    pages = [first]
+    if offsets:
+        with ThreadPoolExecutor(max_workers=min(LIVE_PAGE_WORKERS, len(offsets))) as pool:
+            pages.extend(pool.map(_live_page, offsets))
+
+    # Rows shift between pages while matches start/finish; keep the first sighting
     out: List[Dict[str, Any]] = []
-    for m in payload.get("data", []) or []:
-        teams = m.get("teams") or []
-        if not teams and m.get("teamInfo"):
-            teams = [ti.get("name", "") for ti in m.get("teamInfo", [])]
-        name = m.get("name") or (" vs ".join([t for t in teams if t]) or "Match")
-        out.append({
-            "id": m.get("id") or m.get("unique_id") or name,
-            "name": name,
-            "status": m.get("status", ""),
-            "teams": teams,
-            "venue": m.get("venue", ""),
-            "date": m.get("date") or m.get("dateTimeGMT") or "",
-            "tossWinner": m.get("tossWinner"),
-            "matchWinner": m.get("matchWinner"),
-        })
+    seen = set()
+    for page in pages:
+        for m in (page or {}).get("matches", []):
+            if m["id"] not in seen:
+                seen.add(m["id"])
+                out.append(m)
     return out
 
 
@@ -0,0 +1,209 @@
+"""
+Cross-process cache on a local SQLite file.
+
+Every app worker (gunicorn, `flask run --with-threads`, the backfill, ...)
+opens the same file, so a payload is stored once and fetched upstream once no
+matter how many processes are serving. `get_or_compute` takes a short lease
+on the key before computing, so when an entry expires only one worker
+refreshes it while the others wait for the new value.
+
+Values must be JSON-serializable (API payloads and impact rows are).
+
+Configuration (environment variables, all optional):
+  CRICIMPACT_CACHE_PATH       SQLite file (default: data/cache.sqlite)
+  CRICIMPACT_CACHE_MAX_BYTES  size budget before eviction (default: 64 MB)
+  CRICIMPACT_CACHE_TTL        default TTL in seconds (default: 30)
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+CACHE_PATH = os.getenv("CRICIMPACT_CACHE_PATH", "data/cache.sqlite")
+MAX_BYTES = int(os.getenv("CRICIMPACT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+DEFAULT_TTL = float(os.getenv("CRICIMPACT_CACHE_TTL", "30"))
+
+_MISS = object()
+
+
+class SharedCache:
+    """
+    get / set / get_or_compute over one SQLite file, safe across processes.
+
+    Expired entries are removed lazily; when the stored size passes
+    `max_bytes`, entries closest to expiry are evicted first. Cache errors
+    never propagate: on any SQLite problem the value is simply computed.
+    """
+
+    def __init__(
+        self,
+        path: str = CACHE_PATH,
+        max_bytes: int = MAX_BYTES,
+        lock_timeout: float = 15.0,
+        poll_interval: float = 0.05,
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self._token = uuid.uuid4().hex[:8]
+        self._local = threading.local()
+        self._ready = False
+
+    @property
+    def _owner(self) -> str:
+        return f"{os.getpid()}-{self._token}"
+
+    # ---- connection ----
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():   # never reuse a connection across fork()
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")     # readers never block the writer
+            conn.execute("PRAGMA synchronous=NORMAL")   # it's a cache; durability isn't the point
+            if not self._ready:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS cache_entries (
+                        key TEXT PRIMARY KEY,
+                        value BLOB NOT NULL,
+                        expires REAL NOT NULL,
+                        size INTEGER NOT NULL
+                    ) WITHOUT ROWID
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_expires ON cache_entries (expires)")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS cache_locks (
+                        key TEXT PRIMARY KEY,
+                        owner TEXT NOT NULL,
+                        expires REAL NOT NULL
+                    ) WITHOUT ROWID
+                """)
+                self._ready = True
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # ---- basic ops ----
+    def _get(self, key: str) -> Any:
+        row = self._conn().execute(
+            "SELECT value FROM cache_entries WHERE key = ? AND expires > ?", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else _MISS
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            value = self._get(key)
+        except sqlite3.Error:
+            return default
+        return default if value is _MISS else value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        blob = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, expires, size) VALUES (?, ?, ?, ?)",
+                (key, blob, now + (DEFAULT_TTL if ttl is None else ttl), len(blob)),
+            )
+            self._evict(conn, now)
+        except sqlite3.Error:
+            pass
+
+    def delete(self, key: str) -> None:
+        try:
+            self._conn().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+        except sqlite3.Error:
+            pass
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        conn.execute("DELETE FROM cache_entries WHERE expires <= ?", (now,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+        if total > self.max_bytes:
+            # Drop the entries that would expire soonest until we're back under budget
+            conn.execute("""
+                DELETE FROM cache_entries WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, size, SUM(size) OVER (ORDER BY expires, key) AS running
+                        FROM cache_entries
+                    ) WHERE running - size < ?
+                )
+            """, (total - self.max_bytes,))
+
+    # ---- cross-process single flight ----
+    def _acquire(self, key: str) -> bool:
+        now = time.time()
+        cur = self._conn().execute("""
+            INSERT INTO cache_locks (key, owner, expires) VALUES (?, ?, ?)
+            ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires = excluded.expires
+            WHERE cache_locks.expires < ?
+        """, (key, self._owner, now + self.lock_timeout, now))
+        return cur.rowcount == 1
+
+    def _release(self, key: str) -> None:
+        try:
+            self._conn().execute("DELETE FROM cache_locks WHERE key = ? AND owner = ?", (key, self._owner))
+        except sqlite3.Error:
+            pass
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: Optional[float] = None,
+        cache_if: Callable[[Any], bool] = lambda v: v is not None,
+    ) -> Any:
+        """
+        Return the cached value for `key`, or compute, store and return it.
+
+        Only one process computes a given key at a time; the rest poll for its
+        result for up to `lock_timeout` seconds and then compute it themselves
+        rather than hang a request. Results failing `cache_if` (by default
+        None, i.e. an upstream error) are returned but not stored.
+        """
+        try:
+            value = self._get(key)
+            if value is not _MISS:
+                return value
+            deadline = time.monotonic() + self.lock_timeout
+            while not self._acquire(key):
+                if time.monotonic() > deadline:
+                    return compute()
+                time.sleep(self.poll_interval)
+                value = self._get(key)
+                if value is not _MISS:
+                    return value
+        except sqlite3.Error:
+            return compute()
+
+        try:
+            value = self.get(key, _MISS)  # filled while we were waiting for the lease?
+            if value is not _MISS:
+                return value
+            value = compute()
+            if cache_if(value):
+                self.set(key, value, ttl)
+            return value
+        finally:
+            self._release(key)
+
+
+_shared: Optional[SharedCache] = None
+
+
+def get_cache() -> SharedCache:
+    """The process-wide SharedCache (one SQLite connection per thread)."""
+    global _shared
+    if _shared is None:
+        _shared = SharedCache()
+    return _shared